@@ -1,11 +1,36 @@
 # AI模块初始化
-from .xiaoma_adapter import XiaomaAdapter
-from .openai_compatible import OpenAICompatibleAdapter
-from .iflow_adapter import iFlowAdapter
-from .prompt_generator import PromptGenerator
-from .iflow_workflow import WorkflowManager, Workflow, WorkflowStep, WORKFLOW_PRESETS
+# 子模块按需导入（PEP 562），避免导入包时就加载 openai、aiohttp 等重量级依赖
+import importlib
+
+# 导出名称 -> 所在子模块
+_LAZY_IMPORTS = {
+    'OpenAIAdapter': '.xiaoma_adapter',
+    'XiaomaAdapter': '.xiaoma_adapter',
+    'OpenAICompatibleAdapter': '.openai_compatible',
+    'iFlowAdapter': '.iflow_adapter',
+    'PromptGenerator': '.prompt_generator',
+    'WorkflowManager': '.iflow_workflow',
+    'Workflow': '.iflow_workflow',
+    'WorkflowStep': '.iflow_workflow',
+    'WORKFLOW_PRESETS': '.iflow_workflow',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
+    'OpenAIAdapter',
     'XiaomaAdapter',
     'OpenAICompatibleAdapter',
     'iFlowAdapter',
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多适配器对冲请求
+同一请求并发发给多个适配器，返回最先成功的响应并取消其余请求；
+某个上游出错时不必等它失败后再串行重试下一个。
+适配器出错时可能抛出异常，也可能返回含 "error" 键的字典，两者都视为失败。
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+async def chat_first_success(adapters: Sequence[Any], messages: List[Dict], **kwargs) -> Dict[str, Any]:
+    """
+    并发调用各适配器的 chat()，返回第一个成功的响应
+
+    Args:
+        adapters: 适配器列表（只有一个时直接调用）
+        messages: 消息列表
+        kwargs: 透传给 chat() 的参数
+
+    Returns:
+        第一个成功的响应；所有适配器都返回错误字典时，返回最后一个错误字典
+
+    Raises:
+        所有适配器都失败且至少一个抛出异常时，抛出最后一个异常
+    """
+    if len(adapters) == 1:
+        return await adapters[0].chat(messages, **kwargs)
+
+    pending = {asyncio.ensure_future(adapter.chat(messages, **kwargs)) for adapter in adapters}
+    last_error: BaseException = RuntimeError("没有可用的适配器")
+    last_error_response = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    result = task.result()
+                    if not (isinstance(result, dict) and "error" in result):
+                        return result
+                    last_error_response = result
+                    error = result["error"]
+                else:
+                    last_error = error
+                logger.warning("对冲请求中一个适配器失败，等待其余适配器: %s", error)
+        if last_error_response is not None:
+            return last_error_response
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
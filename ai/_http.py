@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 会话
+所有适配器共用一个 aiohttp ClientSession，使 Keep-Alive 连接（TCP + TLS）能跨请求复用；
+并按上游提供熔断器，上游持续故障时快速失败
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 连接池参数
+CONNECTION_LIMIT = 64
+CONNECTION_LIMIT_PER_HOST = 16
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 75
+CONNECT_TIMEOUT = 5
+DEFAULT_TOTAL_TIMEOUT = 60
+
+# 熔断参数：连续失败次数阈值、熔断后的冷却时间（秒）
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOL_DOWN = 30
+
+_session = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_circuit_breakers: Dict[str, "CircuitBreaker"] = {}
+
+
+class CircuitOpenError(Exception):
+    """上游服务已熔断，请求被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    简单熔断器
+
+    连续失败达到阈值后进入熔断状态，冷却时间内的请求直接失败，避免每次都等到超时；
+    冷却结束后进入半开状态，只放行一次试探请求，试探结束前其余请求仍直接失败；
+    试探成功则恢复，失败则继续熔断。试探请求既未记录成功也未记录失败（如被取消）时，
+    再过一个冷却时间放行下一次试探。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 cool_down: float = CIRCUIT_COOL_DOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        # 半开状态下试探请求的放行时间，None 表示没有进行中的试探
+        self._trial_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """当前状态："closed"、"open" 或 "half_open" """
+        if self._opened_at is None:
+            return "closed"
+        return "open" if self._trial_at is None else "half_open"
+
+    def check(self):
+        """请求前调用，熔断中（含半开状态下已有试探请求）则抛出 CircuitOpenError"""
+        if self._opened_at is None:
+            return
+        now = time.monotonic()
+        since = self._opened_at if self._trial_at is None else self._trial_at
+        if now - since < self.cool_down:
+            raise CircuitOpenError(f"{self.name} 暂时不可用，请稍后重试")
+        # 冷却结束：只放行这一次试探请求
+        self._trial_at = now
+
+    def record_success(self):
+        """记录成功请求"""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_at = None
+
+    def record_failure(self):
+        """记录失败请求，连续失败达到阈值时熔断；试探请求失败则重新熔断"""
+        self._failures += 1
+        if self._trial_at is not None:
+            self._opened_at = time.monotonic()
+            self._trial_at = None
+            logger.warning("%s 试探请求失败，继续熔断 %s 秒", self.name, self.cool_down)
+        elif self._failures >= self.failure_threshold and self._opened_at is None:
+            self._opened_at = time.monotonic()
+            logger.warning("%s 连续失败 %s 次，熔断 %s 秒", self.name, self._failures, self.cool_down)
+
+
+class LoopBoundClients:
+    """
+    按事件循环缓存异步客户端
+
+    httpx 连接池绑定在创建它的事件循环上，而 UI 线程可能为每次请求新建事件循环，
+    工作线程中也可能有事件循环同时运行。每个事件循环各用一个客户端：
+    循环切换时不会替换掉另一个线程仍在使用的客户端，也不会每次切换都新建连接池；
+    已关闭的事件循环无法再执行 close()，其客户端在下次创建新客户端时丢弃。
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        """
+        Args:
+            factory: 在当前事件循环中创建客户端的函数
+        """
+        self._factory = factory
+        self._clients: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """获取当前事件循环的客户端，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                for stale in [l for l in self._clients if l.is_closed()]:
+                    del self._clients[stale]
+                client = self._clients[loop] = self._factory()
+            return client
+
+    def pop(self) -> Any:
+        """取出当前事件循环的客户端（由调用方关闭），不存在时返回 None"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._clients.pop(loop, None)
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """获取指定上游（通常为 API 基础 URL）的熔断器，同一上游的适配器共享状态"""
+    breaker = _circuit_breakers.get(name)
+    if breaker is None:
+        breaker = _circuit_breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+async def get_shared_session():
+    """
+    获取绑定到当前事件循环的共享 ClientSession
+
+    aiohttp 会话只能在创建它的事件循环中使用，UI 可能为每次请求新建事件循环，
+    因此事件循环变化时重新创建会话。请求级超时由调用方通过 timeout 参数传入。
+
+    Returns:
+        aiohttp.ClientSession: 共享会话
+    """
+    global _session, _session_loop
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    if _session is not None and not _session.closed and _session_loop is loop:
+        return _session
+
+    if _session is not None and not _session.closed:
+        # 旧事件循环已不可用，无法再 await close()；分离连接器，避免未关闭会话的警告
+        logger.debug("事件循环已变化，重新创建共享 HTTP 会话")
+        _session.detach()
+
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True
+    )
+    _session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=DEFAULT_TOTAL_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
+    _session_loop = loop
+    return _session
+
+
+async def close_shared_session():
+    """关闭共享会话（需在创建它的事件循环中调用）"""
+    global _session, _session_loop
+    session, _session = _session, None
+    _session_loop = None
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _close_at_exit():
+    """进程退出时，如果会话所属的事件循环仍可用，则关闭会话"""
+    loop = _session_loop
+    if _session is None or _session.closed or loop is None:
+        return
+    if loop.is_closed() or loop.is_running():
+        return
+    try:
+        loop.run_until_complete(close_shared_session())
+    except Exception as e:
+        logger.debug("关闭共享 HTTP 会话失败: %s", e)
+
+
+atexit.register(_close_at_exit)
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聊天响应解析
+适配器的 chat() 统一返回 OpenAI 格式的字典，此处集中提取回复文本
+"""
+
+from typing import Any, Dict
+
+
+def extract_content(response: Dict[str, Any]) -> str:
+    """
+    提取 choices[0].message.content
+
+    成功路径直接下标访问，不为每一层构造默认值；结构不完整时返回空字符串
+    """
+    try:
+        return response["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return ""
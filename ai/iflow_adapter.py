@@ -6,11 +6,19 @@ iFlow SDK 适配器
 使用 iflow_sdk 的 IFlowClient 直接调用本地 iFlow CLI
 """
 
+import copy
+import io
 import logging
 import asyncio
-from typing import List, Dict, Any, AsyncGenerator
+import random
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, AsyncGenerator, Optional
 from abc import ABC, abstractmethod
 
+from utils.tokens import count_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,30 +49,105 @@ class iFlowAdapter(BaseAdapter):
 
         Args:
             model: 模型名称，默认 'default'
-            **kwargs: 其他配置参数（保留兼容）
+            **kwargs: 其他配置参数，如 max_retries、retry_delay（重试退避基数秒数）、retry_cap（重试退避上限秒数）、
+                stream_chunk_chars（流式合并字符数）、stream_flush_interval（流式合并间隔秒数）、
+                cache_size（chat 响应缓存条数，0 表示不缓存）
         """
         self.model = model
         # 减少重试次数和延迟，提高响应速度
         self.max_retries = kwargs.get('max_retries', 2)
         self.retry_delay = kwargs.get('retry_delay', 1)
-        logger.info(f"iFlow 适配器初始化完成，模型: {self.model}")
+        self.retry_cap = kwargs.get('retry_cap', 8)
+        # 流式输出合并阈值：累计字符数或距上次输出的时间（秒）任一达到即输出
+        self.stream_chunk_chars = kwargs.get('stream_chunk_chars', 64)
+        self.stream_flush_interval = kwargs.get('stream_flush_interval', 0.016)
+        # chat 响应 LRU 缓存：(模型, 提示词) -> OpenAI 格式响应
+        self.cache_size = kwargs.get('cache_size', 256)
+        self._response_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+        # 复用的 IFlowClient（首次使用时创建），绑定到创建它的事件循环
+        self._client = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_lock: Optional[asyncio.Lock] = None
+        logger.info("iFlow 适配器初始化完成，模型: %s", self.model)
 
     async def __aenter__(self):
         """异步上下文管理器入口"""
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """异步上下文管理器出口 - SDK 自动清理资源"""
+        """异步上下文管理器出口 - 关闭复用的客户端"""
+        await self.aclose()
         return False
 
+    async def aclose(self):
+        """关闭复用的 IFlowClient"""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._reset_client()
+        self._client = None
+
+    @asynccontextmanager
+    async def _session(self):
+        """
+        独占使用复用的 IFlowClient
+
+        同一客户端上的消息流不能交错，因此请求之间串行执行；
+        请求中途出错或被取消时丢弃客户端，下次请求重新连接。
+        """
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not loop:
+            # UI 线程可能为每次请求新建事件循环，旧循环上的客户端无法继续使用
+            if self._client is not None:
+                logger.debug("事件循环已变化，重新创建 iFlow 客户端")
+            self._client = None
+            self._client_loop = loop
+            self._client_lock = asyncio.Lock()
+
+        async with self._client_lock:
+            client = await self._get_client()
+            try:
+                yield client
+            except BaseException:
+                await self._reset_client()
+                raise
+
+    async def _get_client(self):
+        """获取复用的 IFlowClient，首次调用时建立连接"""
+        if self._client is None:
+            from iflow_sdk import IFlowClient
+
+            client = IFlowClient()
+            await client.__aenter__()
+
+            # 快速检查连接（最多5秒），只在建立连接时执行一次
+            connected = await self._wait_for_connection(client, timeout=5)
+            if not connected:
+                logger.warning("iFlow 连接检查超时，尝试直接发送消息")
+
+            self._client = client
+        return self._client
+
+    async def _reset_client(self):
+        """丢弃当前 IFlowClient 并释放其资源"""
+        client, self._client = self._client, None
+        if client is None:
+            return
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            logger.debug("关闭 iFlow 客户端失败: %s", e)
+
     def set_model(self, model: str):
         """设置使用的模型"""
         self.model = model
-        logger.info(f"切换模型: {self.model}")
+        logger.info("切换模型: %s", self.model)
 
     async def _wait_for_connection(self, client, timeout: int = 5) -> bool:
         """
-        快速检查 iFlow 连接状态（优化版，减少等待时间）
+        等待 iFlow 连接就绪
+
+        SDK 提供就绪信号（wait_connected）时直接挂起等待，连接建立即唤醒；
+        否则退化为指数退避探测（5ms 起步，上限 100ms），避免固定间隔轮询的额外延迟。
 
         Args:
             client: IFlowClient 实例
@@ -73,22 +156,37 @@ class iFlowAdapter(BaseAdapter):
         Returns:
             bool: 是否成功连接
         """
-        start_time = asyncio.get_event_loop().time()
-        # 最多等待 timeout 秒，每次检查间隔 0.1 秒
-        while (asyncio.get_event_loop().time() - start_time) < timeout:
+        wait_connected = getattr(client, 'wait_connected', None)
+        if wait_connected is not None:
+            try:
+                await asyncio.wait_for(wait_connected(), timeout=timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+            except Exception as e:
+                logger.debug("等待 iFlow 就绪信号失败，改用状态探测: %s", e)
+
+        # 只探测一次客户端支持的状态接口
+        has_flag = hasattr(client, '_connected')
+        is_connected = getattr(client, 'is_connected', None)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.005
+        while True:
             try:
-                # 检查客户端是否已连接
-                if hasattr(client, '_connected') and client._connected:
+                if has_flag and client._connected:
+                    return True
+                if is_connected is not None and await is_connected():
                     return True
-                if hasattr(client, 'is_connected'):
-                    is_conn = await client.is_connected()
-                    if is_conn:
-                        return True
-                # 短暂等待后重试
-                await asyncio.sleep(0.1)
             except Exception:
-                await asyncio.sleep(0.1)
-        return False
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
 
     async def chat(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
         """
@@ -96,29 +194,37 @@ class iFlowAdapter(BaseAdapter):
 
         Args:
             messages: OpenAI 格式的消息列表
-            kwargs: 其他参数（保留兼容）
+            kwargs: 其他参数；use_cache=False 或 temperature > 0 时不使用响应缓存
 
         Returns:
             OpenAI 格式的响应
         """
         try:
-            from iflow_sdk import IFlowClient, AssistantMessage, TaskFinishMessage
-
             # 转换消息为文本
             prompt = self._convert_messages(messages)
 
-            # 使用 SDK 的上下文管理器 - 自动管理 iFlow 进程和端口
-            async with IFlowClient() as client:
-                # 快速检查连接（最多5秒）
-                connected = await self._wait_for_connection(client, timeout=5)
-                if not connected:
-                    logger.warning("iFlow 连接检查超时，尝试直接发送消息")
-
+            # 同一段文本常被重复划选，命中缓存时直接返回
+            use_cache = (
+                self.cache_size > 0
+                and kwargs.get('use_cache', True)
+                and (kwargs.get('temperature') or 0) <= 0
+            )
+            cache_key = (self.model, prompt)
+            if use_cache:
+                cached = self._get_cached_response(cache_key)
+                if cached is not None:
+                    return cached
+
+            from iflow_sdk import AssistantMessage, TaskFinishMessage
+
+            # 复用长连接客户端，避免每次请求重复启动和握手
+            async with self._session() as client:
                 # 发送消息
                 await client.send_message(prompt)
 
                 # 收集完整响应（添加超时机制）
                 full_response = []
+                timed_out = False
                 try:
                     async with asyncio.timeout(60):  # 60秒总超时
                         async for message in client.receive_messages():
@@ -128,19 +234,50 @@ class iFlowAdapter(BaseAdapter):
                                 break
                 except asyncio.TimeoutError:
                     logger.warning("响应接收超时，返回已接收内容")
+                    timed_out = True
+                    # 未读完的消息会污染下一次请求，丢弃该连接
+                    await self._reset_client()
 
                 content = "".join(full_response)
                 if not content:
                     return self._format_error("iFlow 返回空响应或超时")
-                return self._format_response(content)
+                response = self._format_response(content, prompt)
+                # 超时截断的内容不完整，不写入缓存
+                if use_cache and not timed_out:
+                    self._put_cached_response(cache_key, response)
+                return response
 
         except ImportError as e:
-            logger.error(f"iflow_sdk 导入失败: {e}")
+            logger.error("iflow_sdk 导入失败: %s", e)
             return self._format_error("iFlow SDK 未安装")
         except Exception as e:
-            logger.error(f"iFlow 调用失败: {e}")
+            logger.error("iFlow 调用失败: %s", e)
             return self._format_error(str(e))
 
+    def _get_cached_response(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """读取缓存的响应，返回副本并更新 id 和时间戳"""
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return None
+        self._response_cache.move_to_end(key)
+        response = copy.deepcopy(cached)
+        now = int(time.time())
+        response["id"] = f"iflow-{now}"
+        response["created"] = now
+        logger.debug("命中 iFlow 响应缓存")
+        return response
+
+    def _put_cached_response(self, key: tuple, response: Dict[str, Any]):
+        """写入响应缓存，超出容量时淘汰最久未使用的条目"""
+        self._response_cache[key] = copy.deepcopy(response)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.cache_size:
+            self._response_cache.popitem(last=False)
+
+    def clear_cache(self):
+        """清空响应缓存"""
+        self._response_cache.clear()
+
     async def stream_chat(self, messages: List[Dict], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
         """
         流式聊天（使用 iFlow SDK）- 优化版，减少等待时间
@@ -157,30 +294,46 @@ class iFlowAdapter(BaseAdapter):
 
         while retry_count < self.max_retries:
             try:
-                from iflow_sdk import IFlowClient, AssistantMessage, TaskFinishMessage
+                from iflow_sdk import AssistantMessage, TaskFinishMessage
 
                 prompt = self._convert_messages(messages)
 
-                async with IFlowClient() as client:
-                    # 快速检查连接（最多5秒）
-                    connected = await self._wait_for_connection(client, timeout=5)
-                    if not connected:
-                        logger.debug("iFlow 连接未就绪，尝试直接发送")
-
+                async with self._session() as client:
                     await client.send_message(prompt)
 
                     chunk_count = 0
+                    # 合并细碎的消息块后再输出，减少下游 UI 更新次数
+                    loop = asyncio.get_running_loop()
+                    buf: List[str] = []
+                    buf_len = 0
+                    last_flush = loop.time()
+                    timed_out = False
                     try:
                         # 使用超时机制，防止无限等待
                         async with asyncio.timeout(120):  # 2分钟总超时
                             async for message in client.receive_messages():
                                 if isinstance(message, AssistantMessage):
-                                    yield {"content": message.chunk.text, "delta": True}
+                                    text = message.chunk.text
+                                    buf.append(text)
+                                    buf_len += len(text)
                                     chunk_count += 1
+                                    now = loop.time()
+                                    if (buf_len >= self.stream_chunk_chars
+                                            or now - last_flush >= self.stream_flush_interval):
+                                        yield {"content": "".join(buf), "delta": True}
+                                        buf.clear()
+                                        buf_len = 0
+                                        last_flush = now
                                 elif isinstance(message, TaskFinishMessage):
                                     break
                     except asyncio.TimeoutError:
                         logger.warning("流式响应接收超时")
+                        await self._reset_client()
+                        timed_out = True
+
+                    if buf:
+                        yield {"content": "".join(buf), "delta": True}
+                    if timed_out:
                         yield {"error": "响应超时，请重试"}
                         return
 
@@ -190,17 +343,19 @@ class iFlowAdapter(BaseAdapter):
                         raise Exception("未收到任何响应数据")
 
             except ImportError as e:
-                logger.error(f"iflow_sdk 导入失败: {e}")
+                logger.error("iflow_sdk 导入失败: %s", e)
                 yield {"error": "iFlow SDK 未安装"}
                 return
             except Exception as e:
                 last_error = e
                 retry_count += 1
-                logger.warning(f"流式请求失败（尝试 {retry_count}/{self.max_retries}）: {e}")
+                logger.warning("流式请求失败（尝试 %s/%s）: %s", retry_count, self.max_retries, e)
                 if retry_count < self.max_retries:
-                    await asyncio.sleep(self.retry_delay)
+                    # 指数退避加随机抖动，避免 iFlow 刚恢复时被同步重试冲击
+                    delay = self.retry_delay * (2 ** (retry_count - 1)) + random.uniform(0, 0.25)
+                    await asyncio.sleep(min(delay, self.retry_cap))
                 else:
-                    logger.error(f"流式请求最终失败: {e}")
+                    logger.error("流式请求最终失败: %s", e)
                     yield {"error": f"连接失败: {str(e)}"}
 
     async def execute_workflow(self, workflow_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -215,12 +370,9 @@ class iFlowAdapter(BaseAdapter):
             Dict: 工作流执行结果
         """
         try:
-            from iflow_sdk import IFlowClient, AssistantMessage, TaskFinishMessage
-
-            async with IFlowClient() as client:
-                # 快速检查连接
-                await self._wait_for_connection(client, timeout=5)
+            from iflow_sdk import AssistantMessage, TaskFinishMessage
 
+            async with self._session() as client:
                 # 检查 SDK 是否支持工作流执行
                 if hasattr(client, 'execute_workflow'):
                     result = await client.execute_workflow(
@@ -233,38 +385,38 @@ class iFlowAdapter(BaseAdapter):
                     prompt = f"执行工作流 '{workflow_name}':\n{params}"
                     await client.send_message(prompt)
 
-                    full_response = []
+                    # 边接收边写入缓冲区，避免先收集列表再整体拼接
+                    buf = io.StringIO()
                     try:
                         async with asyncio.timeout(60):
                             async for message in client.receive_messages():
                                 if isinstance(message, AssistantMessage):
-                                    full_response.append(message.chunk.text)
+                                    buf.write(message.chunk.text)
                                 elif isinstance(message, TaskFinishMessage):
                                     break
                     except asyncio.TimeoutError:
-                        pass
+                        await self._reset_client()
 
                     return {
                         "workflow": workflow_name,
-                        "result": "".join(full_response)
+                        "result": buf.getvalue()
                     }
 
         except Exception as e:
-            logger.error(f"工作流执行失败: {e}")
+            logger.error("工作流执行失败: %s", e)
             return {"error": str(e)}
 
     def _convert_messages(self, messages: List[Dict]) -> str:
         """将 OpenAI 消息格式转换为纯文本"""
-        text_parts = []
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            text_parts.append(f"[{role}]: {content}")
-        return '\n'.join(text_parts)
-
-    def _format_response(self, content: str) -> Dict[str, Any]:
+        return '\n'.join([
+            f"[{msg.get('role', 'user')}]: {msg.get('content', '')}"
+            for msg in messages
+        ])
+
+    def _format_response(self, content: str, prompt: str = "") -> Dict[str, Any]:
         """格式化响应为 OpenAI 格式"""
-        import time
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
         return {
             "id": f"iflow-{int(time.time())}",
             "object": "chat.completion",
@@ -279,9 +431,9 @@ class iFlowAdapter(BaseAdapter):
                 "finish_reason": "stop"
             }],
             "usage": {
-                "prompt_tokens": len(content) // 4,
-                "completion_tokens": len(content) // 4,
-                "total_tokens": len(content) // 2
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
             }
         }
 
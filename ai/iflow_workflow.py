@@ -5,13 +5,21 @@ iFlow 工作流支持
 提供智能任务规划、多步骤处理和链式调用能力
 """
 
+import asyncio
 import logging
+import re
+from itertools import groupby
 from typing import List, Dict, Any, Optional, Callable
 from enum import Enum
 from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
 
+# 条件判断用的预编译正则
+_RE_CJK = re.compile(r'[\u4e00-\u9fff]')
+_RE_LATIN = re.compile(r'[A-Za-z]')
+_RE_CODE = re.compile(r'```|def |function ')
+
 
 class WorkflowStepType(Enum):
     """工作流步骤类型"""
@@ -39,31 +47,59 @@ class WorkflowStep:
         step_type: WorkflowStepType,
         name: str,
         condition: WorkflowCondition = WorkflowCondition.ALWAYS,
-        options: Optional[Dict[str, Any]] = None
+        options: Optional[Dict[str, Any]] = None,
+        parallel: bool = False
     ):
+        """
+        Args:
+            parallel: 是否与相邻的并行步骤并发执行；并行步骤都处理同一输入，
+                其结果不作为后续步骤的输入
+        """
         self.step_type = step_type
         self.name = name
         self.condition = condition
         self.options = options or {}
+        self.parallel = parallel
+        # 创建时绑定条件判断函数，执行时无需再查表
+        self._predicate = _CONDITION_CHECKS.get(condition, _CONDITION_CHECKS[WorkflowCondition.ALWAYS])
 
     def should_execute(self, text: str, context: Dict[str, Any]) -> bool:
         """判断是否应该执行此步骤"""
-        if self.condition == WorkflowCondition.ALWAYS:
-            return True
-        elif self.condition == WorkflowCondition.IF_LONG_TEXT:
-            return len(text) > 500
-        elif self.condition == WorkflowCondition.IF_SHORT_TEXT:
-            return len(text) <= 500
-        elif self.condition == WorkflowCondition.IF_CONTAINS_CODE:
-            return "```" in text or "def " in text or "function " in text
-        elif self.condition == WorkflowCondition.IF_MULTILINGUAL:
-            # 简单检测多语言
-            import re
-            pattern = re.compile(r'[\u4e00-\u9fff]+')
-            has_chinese = pattern.search(text) is not None
-            has_english = any(c.isalpha() and c.isascii() for c in text)
-            return has_chinese and has_english
-        return True
+        return self._predicate(text, context)
+
+
+def _contains_code(text: str, context: Dict[str, Any]) -> bool:
+    """检测代码片段；所有标记都含空格或反引号，先做廉价的成员检查"""
+    if len(text) < 3 or (' ' not in text and '`' not in text):
+        return False
+    return _RE_CODE.search(text) is not None
+
+
+def _is_multilingual(text: str, context: Dict[str, Any]) -> bool:
+    """简单检测多语言：同时包含中文和英文字母
+
+    结果按输入文本缓存在工作流上下文中，同一次执行的多个步骤只扫描一次。
+    """
+    if len(text) < 2:
+        return False
+
+    cached = context.get('_multilingual')
+    if cached is not None and cached[0] is text:
+        return cached[1]
+
+    result = _RE_CJK.search(text) is not None and _RE_LATIN.search(text) is not None
+    context['_multilingual'] = (text, result)
+    return result
+
+
+# 条件 -> 判断函数，参数为 (text, context)
+_CONDITION_CHECKS: Dict[WorkflowCondition, Callable[[str, Dict[str, Any]], bool]] = {
+    WorkflowCondition.ALWAYS: lambda text, context: True,
+    WorkflowCondition.IF_LONG_TEXT: lambda text, context: len(text) > 500,
+    WorkflowCondition.IF_SHORT_TEXT: lambda text, context: len(text) <= 500,
+    WorkflowCondition.IF_CONTAINS_CODE: _contains_code,
+    WorkflowCondition.IF_MULTILINGUAL: _is_multilingual,
+}
 
 
 class Workflow:
@@ -74,15 +110,27 @@ class Workflow:
         self.description = description
         self.steps: List[WorkflowStep] = []
         self.context: Dict[str, Any] = {}
+        # 添加步骤时按条件分组：ALWAYS 步骤无需每次判断
+        self._always_steps: List[WorkflowStep] = []
+        self._conditional_steps: List[WorkflowStep] = []
 
     def add_step(self, step: WorkflowStep):
         """添加工作流步骤"""
         self.steps.append(step)
+        if step.condition is WorkflowCondition.ALWAYS:
+            self._always_steps.append(step)
+        else:
+            self._conditional_steps.append(step)
         return self
 
     def get_executable_steps(self, text: str) -> List[WorkflowStep]:
-        """获取可执行的步骤列表"""
-        return [step for step in self.steps if step.should_execute(text, self.context)]
+        """获取可执行的步骤列表（保持添加顺序）"""
+        if not self._conditional_steps:
+            return list(self._always_steps)
+        return [
+            step for step in self.steps
+            if step.condition is WorkflowCondition.ALWAYS or step.should_execute(text, self.context)
+        ]
 
 
 class WorkflowManager:
@@ -116,13 +164,13 @@ class WorkflowManager:
             description="智能分析：根据文本类型自动选择处理方式"
         )
         smart_analysis.add_step(
-            WorkflowStep(WorkflowStepType.TRANSLATE, "翻译", condition=WorkflowCondition.IF_MULTILINGUAL)
+            WorkflowStep(WorkflowStepType.TRANSLATE, "翻译", condition=WorkflowCondition.IF_MULTILINGUAL, parallel=True)
         )
         smart_analysis.add_step(
-            WorkflowStep(WorkflowStepType.EXPLAIN, "解释", condition=WorkflowCondition.IF_LONG_TEXT)
+            WorkflowStep(WorkflowStepType.EXPLAIN, "解释", condition=WorkflowCondition.IF_LONG_TEXT, parallel=True)
         )
         smart_analysis.add_step(
-            WorkflowStep(WorkflowStepType.SUMMARIZE, "总结", condition=WorkflowCondition.IF_LONG_TEXT)
+            WorkflowStep(WorkflowStepType.SUMMARIZE, "总结", condition=WorkflowCondition.IF_LONG_TEXT, parallel=True)
         )
         self.workflows["smart_analysis"] = smart_analysis
 
@@ -149,12 +197,12 @@ class WorkflowManager:
         )
         self.workflows["quick_translate"] = quick_translate
 
-        logger.info(f"初始化了 {len(self.workflows)} 个默认工作流")
+        logger.info("初始化了 %s 个默认工作流", len(self.workflows))
 
     def register_workflow(self, workflow: Workflow):
         """注册自定义工作流"""
         self.workflows[workflow.name] = workflow
-        logger.info(f"注册工作流: {workflow.name}")
+        logger.info("注册工作流: %s", workflow.name)
 
     def get_workflow(self, name: str) -> Optional[Workflow]:
         """获取工作流"""
@@ -194,7 +242,7 @@ class WorkflowManager:
 
         executable_steps = workflow.get_executable_steps(text)
         if not executable_steps:
-            logger.warning(f"工作流 {workflow_name} 没有可执行的步骤")
+            logger.warning("工作流 %s 没有可执行的步骤", workflow_name)
             return {
                 "workflow": workflow_name,
                 "steps_executed": 0,
@@ -205,40 +253,99 @@ class WorkflowManager:
         results = []
         current_text = text
 
-        for step in executable_steps:
-            logger.info(f"执行步骤: {step.name} ({step.step_type.value})")
+        for parallel, group in groupby(executable_steps, key=lambda step: step.parallel):
+            if parallel:
+                # 连续的并行步骤一次性并发执行，耗时取决于最慢的一步
+                results.extend(await self._execute_parallel_steps(list(group), current_text, handlers))
+            else:
+                for step in group:
+                    current_text = await self._execute_step(step, current_text, handlers, results)
+
+        return {
+            "workflow": workflow_name,
+            "steps_executed": len(results),
+            "results": results
+        }
 
-            try:
-                # 获取对应的处理器
-                handler = handlers.get(step.step_type)
-                if not handler:
-                    logger.warning(f"未找到处理器: {step.step_type}")
-                    continue
+    async def _execute_step(
+        self,
+        step: WorkflowStep,
+        current_text: str,
+        handlers: Dict[WorkflowStepType, Callable],
+        results: List[Dict[str, Any]]
+    ) -> str:
+        """顺序执行单个步骤并记录结果，返回供下一步使用的文本"""
+        logger.info("执行步骤: %s (%s)", step.name, step.step_type.value)
+
+        try:
+            # 获取对应的处理器
+            handler = handlers.get(step.step_type)
+            if not handler:
+                logger.warning("未找到处理器: %s", step.step_type)
+                return current_text
+
+            # 执行步骤
+            result = await handler(current_text, **step.options)
+            results.append({
+                "step": step.name,
+                "type": step.step_type.value,
+                "result": result
+            })
+
+            # 更新当前文本（用于链式处理）
+            return result
+
+        except Exception as e:
+            logger.error("步骤执行失败: %s, 错误: %s", step.name, e)
+            results.append({
+                "step": step.name,
+                "type": step.step_type.value,
+                "error": str(e)
+            })
+            return current_text
+
+    async def _execute_parallel_steps(
+        self,
+        steps: List[WorkflowStep],
+        text: str,
+        handlers: Dict[WorkflowStepType, Callable]
+    ) -> List[Dict[str, Any]]:
+        """并发执行一组互不依赖的步骤，结果按步骤顺序返回"""
+        runnable = []
+        for step in steps:
+            handler = handlers.get(step.step_type)
+            if not handler:
+                logger.warning("未找到处理器: %s", step.step_type)
+                continue
+            logger.info("并行执行步骤: %s (%s)", step.name, step.step_type.value)
+            runnable.append((step, handler))
+
+        async def run(step: WorkflowStep, handler: Callable):
+            return await handler(text, **step.options)
+
+        outcomes = await asyncio.gather(
+            *[run(step, handler) for step, handler in runnable],
+            return_exceptions=True
+        )
 
-                # 执行步骤
-                result = await handler(current_text, **step.options)
+        results = []
+        for (step, _), outcome in zip(runnable, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error("步骤执行失败: %s, 错误: %s", step.name, outcome)
                 results.append({
                     "step": step.name,
                     "type": step.step_type.value,
-                    "result": result
+                    "error": str(outcome)
                 })
-
-                # 更新当前文本（用于链式处理）
-                current_text = result
-
-            except Exception as e:
-                logger.error(f"步骤执行失败: {step.name}, 错误: {e}")
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
                 results.append({
                     "step": step.name,
                     "type": step.step_type.value,
-                    "error": str(e)
+                    "result": outcome
                 })
-
-        return {
-            "workflow": workflow_name,
-            "steps_executed": len(results),
-            "results": results
-        }
+        return results
 
 
 # 预定义的工作流配置
@@ -6,15 +6,24 @@ Ollama API适配器
 """
 
 import os
+import time
 import logging
 import asyncio
 from pathlib import Path
 from typing import Optional, List, Dict, Any, AsyncGenerator
 from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+from ._http import LoopBoundClients
 
 # 添加项目根目录到路径
 PROJECT_ROOT = Path(__file__).parent.parent  # word-selection-assistant 目录
 
+# 模块导入时加载一次环境变量，不在每次创建适配器时重复读取
+_ENV_PATH = PROJECT_ROOT / ".env"
+if _ENV_PATH.exists():
+    load_dotenv(_ENV_PATH)
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,41 +52,66 @@ class OllamaAdapter(BaseAdapter):
             api_key: API密钥（Ollama通常不需要，保留兼容性）
             api_base: API基础URL（可选，默认从.env或默认值读取）
         """
-        # 加载环境变量
-        from dotenv import load_dotenv
-        env_path = PROJECT_ROOT / ".env"
-        if env_path.exists():
-            load_dotenv(env_path)
-
         # Ollama通常不需要API密钥，但保留用于兼容性
         self.api_key = api_key or os.getenv('OLLAMA_API_KEY', '') or os.getenv('OPENAI_API_KEY', '')
         
         # 默认Ollama API地址
         self.api_base = (api_base or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434/v1')).rstrip('/')
         
-        # 获取模型列表并设置默认模型
-        available_models = self.get_available_models()
-        if available_models:
-            self.model = available_models[0]  # 使用第一个可用模型作为默认值
-        else:
-            self.model = "llama3.2"  # 如果无法获取模型列表，则使用默认模型名
-        
-        # 创建复用的 OpenAI 客户端（自动连接池）
-        from openai import OpenAI
-        self.client = OpenAI(
+        # 先使用默认模型名，模型列表在首次请求前再探测（避免初始化时阻塞在网络请求上）；
+        # 未显式设置模型时，探测成功后改用第一个已安装的模型
+        self.model = "llama3.2"
+        self._model_explicit = False
+
+        # 模型列表缓存（TTL 秒）
+        self.models_cache_ttl = 60
+        self._models_cache: Optional[List[str]] = None
+        self._models_cache_time = 0.0
+        self._http_client = None
+
+        # 异步 OpenAI 客户端及其 httpx 连接池，每个事件循环惰性创建一组；
+        # 模型列表探测复用同一个连接池，避免额外的 TCP 连接
+        self._clients = LoopBoundClients(self._create_clients)
+
+        logger.info("Ollama API配置: base=%s, model=%s", self.api_base, self.model)
+
+    def _create_clients(self):
+        """创建 AsyncOpenAI 客户端及其 httpx 连接池（在使用它们的事件循环中调用）"""
+        import httpx
+        from openai import AsyncOpenAI
+        http_client = httpx.AsyncClient(timeout=30)
+        client = AsyncOpenAI(
             base_url=self.api_base,
             api_key=self.api_key or "ollama",  # Ollama通常不需要真正的API密钥
             timeout=30,
             max_retries=3,
-            http_client=None  # 使用默认 httpx 连接池
+            http_client=http_client  # 与模型列表探测共用连接池
         )
+        return client, http_client
+
+    def _ensure_client(self):
+        """获取当前事件循环的 (AsyncOpenAI 客户端, httpx 连接池)，不存在时创建"""
+        return self._clients.get()
 
-        logger.info(f"Ollama API配置: base={self.api_base}, model={self.model}")
+    @property
+    def client(self):
+        """获取绑定到当前事件循环的 AsyncOpenAI 客户端"""
+        return self._ensure_client()[0]
+
+    async def close(self):
+        """关闭当前事件循环的客户端及同步探测用的连接池"""
+        clients = self._clients.pop()
+        if clients is not None:
+            await clients[0].close()
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
 
     def set_model(self, model: str):
         """设置使用的模型"""
         self.model = model
-        logger.info(f"切换模型: {self.model}")
+        self._model_explicit = True
+        logger.info("切换模型: %s", self.model)
 
     async def chat(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
         """
@@ -91,8 +125,9 @@ class OllamaAdapter(BaseAdapter):
             OpenAI格式的响应
         """
         try:
+            await self._probe_model()
             # 调用Ollama API（非流式）
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 stream=False,
@@ -105,7 +140,7 @@ class OllamaAdapter(BaseAdapter):
             return self._format_response(response)
 
         except Exception as e:
-            logger.error(f"Ollama API请求失败: {e}")
+            logger.error("Ollama API请求失败: %s", e)
             raise
 
     async def stream_chat(self, messages: List[Dict], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
@@ -120,8 +155,9 @@ class OllamaAdapter(BaseAdapter):
             Dict: 包含 'content' 和 'delta' 字段的字典
         """
         try:
+            await self._probe_model()
             # 调用Ollama API（流式）
-            stream_response = self.client.chat.completions.create(
+            stream_response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 stream=True,
@@ -130,12 +166,12 @@ class OllamaAdapter(BaseAdapter):
                 top_p=kwargs.get('top_p', 0.9)
             )
 
-            for chunk in stream_response:
+            async for chunk in stream_response:
                 if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
                     yield {"content": chunk.choices[0].delta.content, "delta": True}
 
         except Exception as e:
-            logger.error(f"Ollama流式请求失败: {e}")
+            logger.error("Ollama流式请求失败: %s", e)
             yield {"error": str(e)}
 
     def _format_response(self, response) -> Dict[str, Any]:
@@ -162,25 +198,81 @@ class OllamaAdapter(BaseAdapter):
             }
         }
 
-    def get_available_models(self) -> List[str]:
+    async def _probe_model(self):
+        """首次请求前探测一次模型列表；已显式设置模型或已探测过时直接返回"""
+        if not self._model_explicit and self._models_cache is None:
+            await self.get_available_models_async()
+
+    async def get_available_models_async(self) -> List[str]:
         """
-        获取可用的Ollama模型列表
-        
+        在异步上下文中获取可用的Ollama模型列表（复用 AsyncOpenAI 的连接池，不阻塞事件循环）
+
         Returns:
             List[str]: 模型名称列表
         """
+        now = time.monotonic()
+        if self._models_cache is not None and now - self._models_cache_time < self.models_cache_ttl:
+            return self._models_cache
+
+        models = None
         try:
-            import requests
-            response = requests.get(f"{self.api_base.replace('/v1', '')}/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                models = [model['name'].split(':')[0] for model in data.get('models', [])]
-                return models
-            else:
-                logger.warning(f"无法获取Ollama模型列表: {response.status_code}")
-                # 返回一些常见的Ollama模型
-                return ["llama3.2", "llama3.1", "mistral", "gemma2", "phi3", "qwen2.5"]
+            _, http_client = self._ensure_client()
+            response = await http_client.get(self._tags_url, timeout=5)
+            models = self._parse_models_response(response)
         except Exception as e:
-            logger.error(f"获取Ollama模型列表失败: {e}")
+            logger.error("获取Ollama模型列表失败: %s", e)
+        return self._update_models_cache(models, now)
+
+    def get_available_models(self) -> List[str]:
+        """
+        获取可用的Ollama模型列表（结果缓存 models_cache_ttl 秒）
+
+        首次成功获取后，如果未显式设置过模型，则使用第一个可用模型作为默认值。
+
+        Returns:
+            List[str]: 模型名称列表
+        """
+        now = time.monotonic()
+        if self._models_cache is not None and now - self._models_cache_time < self.models_cache_ttl:
+            return self._models_cache
+
+        return self._update_models_cache(self._fetch_models(), now)
+
+    @property
+    def _tags_url(self) -> str:
+        """Ollama 原生模型列表接口地址"""
+        return f"{self.api_base.replace('/v1', '')}/api/tags"
+
+    def _update_models_cache(self, models: Optional[List[str]], now: float) -> List[str]:
+        """写入模型列表缓存；探测失败（models 为 None）时使用常见模型列表"""
+        if models is None:
             # 返回一些常见的Ollama模型
-            return ["llama3.2", "llama3.1", "mistral", "gemma2", "phi3", "qwen2.5"]
\ No newline at end of file
+            models = ["llama3.2", "llama3.1", "mistral", "gemma2", "phi3", "qwen2.5"]
+        elif models and not self._model_explicit:
+            self.model = models[0]
+
+        self._models_cache = models
+        self._models_cache_time = now
+        return models
+
+    @staticmethod
+    def _parse_models_response(response) -> Optional[List[str]]:
+        """解析 /api/tags 响应，失败时返回 None"""
+        if response.status_code == 200:
+            data = response.json()
+            return [model['name'].split(':')[0] for model in data.get('models', [])]
+
+        logger.warning("无法获取Ollama模型列表: %s", response.status_code)
+        return None
+
+    def _fetch_models(self) -> Optional[List[str]]:
+        """同步请求 Ollama 的 /api/tags 接口（供非异步调用方使用），失败时返回 None"""
+        try:
+            if self._http_client is None:
+                import httpx
+                self._http_client = httpx.Client(timeout=5)
+
+            return self._parse_models_response(self._http_client.get(self._tags_url))
+        except Exception as e:
+            logger.error("获取Ollama模型列表失败: %s", e)
+        return None
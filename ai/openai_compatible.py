@@ -5,14 +5,43 @@ OpenAI兼容接口适配器
 支持任意兼容OpenAI API格式的模型
 """
 
+import json
 import logging
 import asyncio
+import random
+import time
 import aiohttp
-from typing import Optional, List, Dict, Any, AsyncGenerator
+from typing import Optional, List, Dict, Any, AsyncGenerator, Tuple
 from datetime import datetime
 
+from ._http import CircuitOpenError, get_circuit_breaker, get_shared_session
+
 logger = logging.getLogger(__name__)
 
+# SSE 数据行前缀（按字节比较，避免逐行解码）
+_DATA_PREFIX = b"data: "
+_DONE = b"data: [DONE]"
+_STREAM_READ_SIZE = 8192
+
+# 连接类错误的重试：最多尝试次数、指数退避的初始和最大延迟（秒）
+# 不重试整体超时，避免把一次 60 秒超时放大成数分钟
+_RETRYABLE_ERRORS = (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError, aiohttp.ServerTimeoutError)
+_MAX_ATTEMPTS = 3
+_RETRY_INITIAL_DELAY = 0.2
+_RETRY_MAX_DELAY = 2.0
+
+
+def _parse_sse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """解析一行 SSE 数据，非数据行、结束标记或无效 JSON 返回 None"""
+    line = line.strip()
+    if not line.startswith(_DATA_PREFIX) or line == _DONE:
+        return None
+    try:
+        # json.loads 直接接受 UTF-8 字节，无需先解码
+        return json.loads(line[len(_DATA_PREFIX):])
+    except json.JSONDecodeError:
+        return None
+
 
 class OpenAICompatibleAdapter:
     """OpenAI兼容接口适配器"""
@@ -27,28 +56,77 @@ class OpenAICompatibleAdapter:
             model: 模型名称
         """
         self.api_base = api_base.rstrip('/')
-        self.api_key = api_key
+        self.api_key = api_key  # 同时生成请求头，见 api_key setter
         self.model = model
-        self.session = None
         self.timeout = 60  # 秒
+        self._request_timeout = aiohttp.ClientTimeout(total=self.timeout)
+        self._breaker = get_circuit_breaker(self.api_base)
+        # 模型列表缓存：(获取时间, 模型列表)
+        self.models_cache_ttl = 60  # 秒
+        self._models_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+
+    @property
+    def api_key(self) -> str:
+        """API密钥"""
+        return self._api_key
+
+    @api_key.setter
+    def api_key(self, value: str):
+        """设置API密钥，并预先构建每次请求复用的请求头"""
+        self._api_key = value
+        self._auth_headers = {
+            "Authorization": f"Bearer {value}",
+            "Content-Type": "application/json"
+        }
+        self._auth_headers_noct = {"Authorization": f"Bearer {value}"}
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """获取HTTP会话"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=self.timeout)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+        """获取共享的HTTP会话（所有适配器共用连接池）"""
+        return await get_shared_session()
     
     async def close(self):
-        """关闭会话"""
-        if self.session and not self.session.closed:
-            await self.session.close()
-            self.session = None
+        """关闭会话（共享会话由 ai._http 统一管理，此处无需处理）"""
+
+    async def _post_chat(self, payload: Dict[str, Any]) -> aiohttp.ClientResponse:
+        """
+        发送 chat/completions 请求
+
+        连接失败、服务端断开等瞬时错误按指数退避（带抖动）重试；
+        上游连续失败时由熔断器直接拒绝请求，而不是每次都等到超时。
+        """
+        self._breaker.check()
+        session = await self._get_session()
+
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                response = await session.post(
+                    f"{self.api_base}/chat/completions",
+                    headers=self._auth_headers,
+                    json=payload,
+                    timeout=self._request_timeout
+                )
+            except _RETRYABLE_ERRORS as e:
+                if attempt == _MAX_ATTEMPTS:
+                    self._breaker.record_failure()
+                    raise
+                delay = min(_RETRY_MAX_DELAY, _RETRY_INITIAL_DELAY * 2 ** (attempt - 1))
+                delay += random.uniform(0, _RETRY_INITIAL_DELAY)
+                logger.warning("请求失败（尝试 %s/%s），%.2f 秒后重试: %s", attempt, _MAX_ATTEMPTS, delay, e)
+                await asyncio.sleep(delay)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self._breaker.record_failure()
+                raise
+            else:
+                if response.status >= 500:
+                    self._breaker.record_failure()
+                else:
+                    self._breaker.record_success()
+                return response
     
     def set_model(self, model: str):
         """设置模型"""
         self.model = model
-        logger.info(f"切换模型: {model}")
+        logger.info("切换模型: %s", model)
     
     async def chat(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
         """
@@ -61,13 +139,6 @@ class OpenAICompatibleAdapter:
         Returns:
             API响应
         """
-        session = await self._get_session()
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": self.model,
             "messages": messages,
@@ -80,21 +151,17 @@ class OpenAICompatibleAdapter:
         payload.setdefault("stream", False)
         
         try:
-            async with session.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
+            async with await self._post_chat(payload) as response:
                 
                 if response.status != 200:
                     error_text = await response.text()
-                    logger.error(f"API错误 ({response.status}): {error_text}")
+                    logger.error("API错误 (%s): %s", response.status, error_text)
                     raise Exception(f"API错误: {response.status}")
                 
                 return await response.json()
                 
-        except aiohttp.ClientError as e:
-            logger.error(f"网络错误: {e}")
+        except (aiohttp.ClientError, CircuitOpenError) as e:
+            logger.error("网络错误: %s", e)
             raise
     
     async def stream_chat(self, messages: List[Dict], 
@@ -105,13 +172,6 @@ class OpenAICompatibleAdapter:
         Yields:
             每个数据块的字典
         """
-        session = await self._get_session()
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": self.model,
             "messages": messages,
@@ -123,57 +183,58 @@ class OpenAICompatibleAdapter:
         payload.setdefault("max_tokens", 2000)
         
         try:
-            async with session.post(
-                f"{self.api_base}/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
+            async with await self._post_chat(payload) as response:
                 
                 if response.status != 200:
                     yield {"error": f"API错误: {response.status}"}
                     return
                 
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    
-                    if not line or line == "data: [DONE]":
-                        continue
-                    
-                    if line.startswith("data: "):
-                        data = line[6:]
-                        try:
-                            import json
-                            chunk = json.loads(data)
+                # 按块读取并在字节缓冲区中切分行，避免逐行读取的额外开销
+                buf = bytearray()
+                async for data in response.content.iter_chunked(_STREAM_READ_SIZE):
+                    buf += data
+                    start = 0
+                    while (nl := buf.find(b"\n", start)) >= 0:
+                        chunk = _parse_sse_line(bytes(buf[start:nl]))
+                        start = nl + 1
+                        if chunk is not None:
                             yield chunk
-                        except json.JSONDecodeError:
-                            pass
+                    del buf[:start]
+                
+                # 最后一行可能没有换行符
+                chunk = _parse_sse_line(bytes(buf))
+                if chunk is not None:
+                    yield chunk
                             
-        except aiohttp.ClientError as e:
+        except (aiohttp.ClientError, CircuitOpenError) as e:
             yield {"error": str(e)}
     
     async def list_models(self) -> List[Dict[str, Any]]:
-        """列出可用模型"""
+        """列出可用模型（成功结果缓存 models_cache_ttl 秒）"""
+        now = time.monotonic()
+        if self._models_cache is not None and now - self._models_cache[0] < self.models_cache_ttl:
+            return self._models_cache[1]
+
         session = await self._get_session()
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
         try:
             async with session.get(
                 f"{self.api_base}/models",
-                headers=headers
+                headers=self._auth_headers_noct,
+                timeout=self._request_timeout
             ) as response:
                 
                 if response.status == 200:
                     data = await response.json()
-                    return data.get("data", [])
+                    models = data.get("data", [])
+                    self._models_cache = (now, models)
+                    return models
                 else:
-                    logger.warning(f"无法获取模型列表: {response.status}")
+                    logger.warning("无法获取模型列表: %s", response.status)
                     return []
                     
         except Exception as e:
-            logger.error(f"获取模型列表失败: {e}")
+            logger.error("获取模型列表失败: %s", e)
             return []
     
     def format_message(self, role: str, content: str) -> Dict[str, str]:
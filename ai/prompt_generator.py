@@ -5,13 +5,65 @@ AI提示词生成器
 从配置文件加载和管理提示词模板
 """
 
+import copy
 import logging
+import re
 import yaml
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
+# 优先使用 libyaml 的 C 加速加载器
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 logger = logging.getLogger(__name__)
 
+# 模板变量占位符：{{name}}
+_PLACEHOLDER_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+
+@lru_cache(maxsize=256)
+def _compile_template(template: str) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    将模板预先拆分为 (字面文本, 变量名) 片段，同一模板只解析一次
+
+    变量名为 None 表示该片段之后没有变量。
+    """
+    segments = []
+    pos = 0
+    for match in _PLACEHOLDER_PATTERN.finditer(template):
+        segments.append((template[pos:match.start()], match.group(1)))
+        pos = match.end()
+    segments.append((template[pos:], None))
+    return tuple(segments)
+
+# 已解析的 YAML 文件缓存：路径 -> (mtime, size, 数据)，文件变化后自动失效
+_YAML_CACHE: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+_YAML_CACHE_MAX_ENTRIES = 100
+
+
+def _load_yaml_cached(path: Path) -> Any:
+    """读取 YAML 文件，按 (路径, mtime, 大小) 缓存解析结果，返回深拷贝"""
+    st = path.stat()
+    key = str(path.resolve())
+    cached = _YAML_CACHE.get(key)
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        _YAML_CACHE.move_to_end(key)
+        return copy.deepcopy(cached[2])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=SafeLoader)
+
+    _YAML_CACHE[key] = (st.st_mtime, st.st_size, data)
+    _YAML_CACHE.move_to_end(key)
+    while len(_YAML_CACHE) > _YAML_CACHE_MAX_ENTRIES:
+        _YAML_CACHE.popitem(last=False)
+    return copy.deepcopy(data)
+
 
 class PromptGenerator:
     """AI提示词生成器"""
@@ -34,13 +86,12 @@ class PromptGenerator:
         path = Path(file_path)
         if path.exists():
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f)
-                    if data and 'templates' in data:
-                        self.templates = data['templates']
-                    logger.info(f"已加载 {len(self.templates)} 个提示词模板")
+                data = _load_yaml_cached(path)
+                if data and 'templates' in data:
+                    self.templates = data['templates']
+                logger.info("已加载 %s 个提示词模板", len(self.templates))
             except Exception as e:
-                logger.error(f"加载模板失败: {e}")
+                logger.error("加载模板失败: %s", e)
     
     def get_prompt(self, feature_type: str, text: str, 
                    context: Dict[str, Any] = None) -> str:
@@ -78,12 +129,13 @@ class PromptGenerator:
         return self._create_default_prompt(feature_type, text, context)
     
     def _fill_template(self, template: str, context: Dict[str, Any]) -> str:
-        """填充模板变量"""
-        result = template
-        for key, value in context.items():
-            placeholder = f"{{{{{key}}}}}"
-            result = result.replace(placeholder, str(value))
-        return result.strip()
+        """填充模板变量（按预编译片段拼接，未知变量保持原样）"""
+        parts = []
+        for literal, key in _compile_template(template):
+            parts.append(literal)
+            if key is not None:
+                parts.append(str(context[key]) if key in context else f"{{{{{key}}}}}")
+        return ''.join(parts).strip()
     
     def _create_default_prompt(self, feature_type: str, text: str, 
                                context: Dict[str, Any]) -> str:
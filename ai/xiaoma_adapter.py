@@ -9,16 +9,52 @@ import os
 import sys
 import logging
 import asyncio
-import aiohttp
+import time
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+from ._http import LoopBoundClients, get_circuit_breaker, get_shared_session
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # 添加项目根目录到路径
 PROJECT_ROOT = Path(__file__).parent.parent  # word-selection-assistant 目录
 
+# 模块导入时加载一次环境变量，不在每次创建适配器时重复读取
+_ENV_PATH = PROJECT_ROOT / ".env"
+if _ENV_PATH.exists():
+    load_dotenv(_ENV_PATH)
+
 logger = logging.getLogger(__name__)
 
+# 常见角色的消息前缀，转换消息时直接查表
+_ROLE_PREFIX = {
+    "user": "[user]: ",
+    "assistant": "[assistant]: ",
+    "system": "[system]: ",
+}
+
+
+def _format_message(msg: Dict) -> str:
+    """将单条消息格式化为 "[role]: content" 形式"""
+    role = msg.get('role', 'user')
+    prefix = _ROLE_PREFIX.get(role) or f"[{role}]: "
+    return prefix + str(msg.get('content', ''))
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """是否为连接失败或超时（openai 把 httpx 的传输层错误包装为 APIConnectionError）"""
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.APIConnectionError)
+
 
 class BaseAdapter(ABC):
     """API适配器基类"""
@@ -45,47 +81,71 @@ class OpenAIAdapter(BaseAdapter):
             api_key: API密钥（可选，默认从.env读取）
             api_base: API基础URL（可选，默认从.env读取）
         """
-        # 加载环境变量
-        from dotenv import load_dotenv
-        env_path = PROJECT_ROOT / ".env"
-        if env_path.exists():
-            load_dotenv(env_path)
-
         # 优先使用Ollama本地配置
         self.api_key = api_key or os.getenv('OLLAMA_API_KEY', '')
         self.api_base = (api_base or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434/v1')).rstrip('/')
         self.model = "qwen3-embedding:0.6b"  # 使用本地Ollama模型
-        self.session = None
 
-        # 创建复用的 OpenAI 客户端（自动连接池）
-        from openai import OpenAI
-        self.client = OpenAI(
+        # 异步 OpenAI 客户端（复用 httpx 连接池），每个事件循环惰性创建一个
+        self._clients = LoopBoundClients(self._create_client)
+        # 上游持续故障时快速失败（客户端自身已带指数退避重试）
+        self._breaker = get_circuit_breaker(self.api_base)
+
+        logger.info("OpenAI兼容API配置: base=%s, key=***", self.api_base)
+
+    def _create_client(self):
+        """创建 AsyncOpenAI 客户端（在使用它的事件循环中调用）"""
+        import httpx
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(
             base_url=self.api_base,
             api_key=self.api_key,
             timeout=30,
             max_retries=3,
-            http_client=None  # 使用默认 httpx 连接池
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
         )
 
-        logger.info(f"OpenAI兼容API配置: base={self.api_base}, key=***")
+    @property
+    def client(self):
+        """获取绑定到当前事件循环的 AsyncOpenAI 客户端"""
+        return self._clients.get()
     
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """获取或创建HTTP会话"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+    async def _create_completion(self, **params):
+        """调用 chat.completions.create，并把结果计入熔断器"""
+        self._breaker.check()
+        try:
+            response = await self.client.chat.completions.create(**params)
+        except Exception as e:
+            status = getattr(e, 'status_code', None)
+            if status is not None:
+                # 4xx 是请求本身的问题，上游仍能正常响应
+                if status >= 500:
+                    self._breaker.record_failure()
+                else:
+                    self._breaker.record_success()
+            elif _is_connection_error(e):
+                self._breaker.record_failure()
+            # 其他异常（参数错误、响应解析失败等）与上游可用性无关，不计入熔断器
+            raise
+        self._breaker.record_success()
+        return response
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """获取共享的HTTP会话（所有适配器共用连接池）"""
+        return await get_shared_session()
     
     async def close(self):
-        """关闭会话"""
-        if self.session and not self.session.closed:
-            await self.session.close()
-            self.session = None
+        """关闭当前事件循环的客户端（共享会话由 ai._http 统一管理，此处无需处理）"""
+        client = self._clients.pop()
+        if client is not None:
+            await client.close()
     
     def set_model(self, model: str):
         """设置使用的模型"""
         self.model = self.model_mapping.get(model, model)
-        logger.info(f"切换模型: {self.model}")
+        logger.info("切换模型: %s", self.model)
     
     async def chat(self, messages: List[Dict], **kwargs) -> Dict[str, Any]:
         """
@@ -109,17 +169,12 @@ class OpenAIAdapter(BaseAdapter):
             return self._format_response(response)
             
         except Exception as e:
-            logger.error(f"API请求失败: {e}")
+            logger.error("API请求失败: %s", e)
             raise
     
     def _convert_messages(self, messages: List[Dict]) -> str:
         """将OpenAI消息格式转换为纯文本"""
-        text_parts = []
-        for msg in messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            text_parts.append(f"[{role}]: {content}")
-        return '\n'.join(text_parts)
+        return '\n'.join(map(_format_message, messages))
     
     async def _call_api_sync(self, prompt: str, **kwargs):
         """
@@ -133,8 +188,8 @@ class OpenAIAdapter(BaseAdapter):
             str: 完整响应
         """
         try:
-            # 非流式调用 - 使用复用的客户端
-            response = self.client.chat.completions.create(
+            # 非流式调用 - 使用复用的异步客户端，不阻塞事件循环
+            response = await self._create_completion(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 stream=False,
@@ -144,7 +199,7 @@ class OpenAIAdapter(BaseAdapter):
             return response.choices[0].message.content
                 
         except Exception as e:
-            logger.error(f"API调用失败: {e}")
+            logger.error("API调用失败: %s", e)
             raise
     
     async def _call_api_stream(self, prompt: str, **kwargs):
@@ -159,29 +214,30 @@ class OpenAIAdapter(BaseAdapter):
             str: 流式输出的内容块
         """
         try:
-            # 流式调用 - 使用复用的客户端
-            stream_response = self.client.chat.completions.create(
+            # 流式调用 - 使用复用的异步客户端
+            stream_response = await self._create_completion(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 stream=True,
                 temperature=kwargs.get('temperature', 0.7)
             )
             
-            for chunk in stream_response:
+            async for chunk in stream_response:
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
                 
         except Exception as e:
-            logger.error(f"API调用失败: {e}")
+            logger.error("API调用失败: %s", e)
             yield f"错误: {str(e)}"
     
     def _format_response(self, content: str) -> Dict[str, Any]:
         """格式化响应为OpenAI格式"""
-        import time
+        now = int(time.time())
+        approx_tokens = len(content) >> 2  # 约 4 字符/token 的粗略估算
         return {
-            "id": f"chatcmpl-{int(time.time())}",
+            "id": f"chatcmpl-{now}",
             "object": "chat.completion",
-            "created": int(time.time()),
+            "created": now,
             "model": self.model,
             "choices": [{
                 "index": 0,
@@ -192,9 +248,9 @@ class OpenAIAdapter(BaseAdapter):
                 "finish_reason": "stop"
             }],
             "usage": {
-                "prompt_tokens": len(content) // 4,
-                "completion_tokens": len(content) // 4,
-                "total_tokens": len(content) // 2
+                "prompt_tokens": approx_tokens,
+                "completion_tokens": approx_tokens,
+                "total_tokens": 2 * approx_tokens
             }
         }
     
@@ -211,21 +267,21 @@ class OpenAIAdapter(BaseAdapter):
         """
         try:
             # 调用真实流式API
-            stream_response = self.client.chat.completions.create(
+            stream_response = await self._create_completion(
                 model=self.model,
                 messages=messages,
                 stream=True,
                 temperature=kwargs.get('temperature', 0.7)
             )
 
-            for chunk in stream_response:
+            async for chunk in stream_response:
                 if chunk.choices[0].delta.content:
                     yield {"content": chunk.choices[0].delta.content, "delta": True}
 
         except Exception as e:
-            logger.error(f"流式请求失败: {e}")
+            logger.error("流式请求失败: %s", e)
             yield {"error": str(e)}
 
 
-# 为了向后兼容，保留XiaomaAdapter名称
+# 为了向后兼容，保留XiaomaAdapter名称（新代码请使用 OpenAIAdapter）
 XiaomaAdapter = OpenAIAdapter
@@ -3,10 +3,16 @@
 """
 功能路由器
 根据用户选择路由到相应的功能处理
+
+成功结果通过 result_ready 信号发出；执行失败时只发出 error_occurred 信号，
+route() 同时返回 "错误: ..." 字符串，调用方可直接根据返回值判断。
 """
 
+import inspect
 import logging
-from typing import Dict, Any, Callable
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Mapping, Tuple
 from enum import Enum
 from dataclasses import dataclass
 from PyQt6.QtCore import QObject, pyqtSignal
@@ -14,8 +20,8 @@ from PyQt6.QtCore import QObject, pyqtSignal
 logger = logging.getLogger(__name__)
 
 
-class FunctionType(Enum):
-    """功能类型枚举"""
+class FunctionType(str, Enum):
+    """功能类型枚举（成员可直接与字符串比较，也可用字符串作为字典键查找）"""
     TRANSLATE = "translate"
     EXPLAIN = "explain"
     SUMMARIZE = "summarize"
@@ -24,6 +30,44 @@ class FunctionType(Enum):
     OPTIMIZE = "optimize"  # 提示词优化功能
     ASK = "ask"  # 基于文本提问功能
 
+    def __str__(self) -> str:
+        # 与字符串格式化保持一致，输出值而不是 "FunctionType.XXX"
+        return self.value
+
+
+# 处理器只接收文本参数的功能类型
+_TEXT_ONLY_FUNCTIONS = (FunctionType.TRANSLATE, FunctionType.EXPLAIN, FunctionType.SUMMARIZE)
+
+# 未传入选项时使用的共享只读空字典，避免每次路由都新建字典
+_EMPTY_OPTIONS = MappingProxyType({})
+
+# 内置功能的描述信息（只读，所有路由器实例共享）
+_BUILTIN_FUNCTIONS = MappingProxyType({
+    "translate": {'name': '翻译', 'description': '翻译文本', 'icon': '🔤'},
+    "explain": {'name': '解释', 'description': '解释内容', 'icon': '💡'},
+    "summarize": {'name': '总结', 'description': '总结要点', 'icon': '📝'},
+    "chart": {'name': '绘图', 'description': '根据文本生成图表', 'icon': '📊'},
+    "optimize": {'name': '优化', 'description': '优化提示词', 'icon': '✨'},
+    "ask": {'name': '提问', 'description': '基于文本提问', 'icon': '❓'}
+})
+
+
+@lru_cache(maxsize=256)
+def _render_prompt(template: str, text: str) -> str:
+    """用文本填充自定义功能模板（重试时常以相同参数重复调用，结果直接复用）"""
+    return template.replace('{text}', text)
+
+
+class _DispatchTable(dict):
+    """
+    分发表：未知功能类型返回格式化提示的同步执行函数（不写入表中）
+
+    这样路由时统一以 self._dispatch[func_type] 取执行函数，无需单独判断未知功能。
+    """
+
+    def __missing__(self, func_type):
+        return (lambda text, options: f"未知功能: {func_type}"), False
+
 
 @dataclass
 class FunctionResult:
@@ -39,110 +83,100 @@ class FunctionRouter(QObject):
 
     # 信号
     result_ready = pyqtSignal(str, str)  # (功能类型, 结果)
+    error_occurred = pyqtSignal(str, str)  # (功能类型, 错误信息)
 
     def __init__(self):
         super().__init__()
         self.handlers: Dict[FunctionType, Callable] = {}
         self.custom_functions: Dict[str, Dict[str, Any]] = {}
+        # 自定义功能的描述信息（键为 custom_<name>），注册时生成
+        self._custom_cache: Dict[str, Dict[str, Any]] = {}
+        # 功能类型 -> (执行函数 (text, options), 是否为协程函数)，路由时直接用字符串查表；
+        # 选项提取在各执行函数内完成，分发时不再经过额外的 lambda 包装。
+        # 是否为协程在注册时判断一次，同步执行函数在路由时直接调用，不创建协程对象
+        self._dispatch: Dict[FunctionType, Tuple[Callable[[str, Mapping[str, Any]], Any], bool]] = _DispatchTable({
+            FunctionType.CUSTOM: (self._execute_custom, False),
+            FunctionType.CHART: (self._execute_chart, True),
+            FunctionType.OPTIMIZE: (self._execute_optimize, True),
+            FunctionType.ASK: (self._execute_ask, True),
+        })
 
     def register_handler(self, func_type: FunctionType, handler: Callable):
         """注册功能处理器"""
         self.handlers[func_type] = handler
-        logger.info(f"已注册功能处理器: {func_type.value}")
+        if func_type in _TEXT_ONLY_FUNCTIONS:
+            self._dispatch[func_type] = (lambda text, options: handler(text),
+                                         inspect.iscoroutinefunction(handler))
+        logger.info("已注册功能处理器: %s", func_type.value)
 
     def register_custom_function(self, name: str, config: Dict[str, Any]):
         """注册自定义功能"""
         self.custom_functions[name] = config
-        logger.info(f"已注册自定义功能: {name}")
+        self._custom_cache[f"custom_{name}"] = {
+            'name': config.get('name', name),
+            'description': config.get('description', ''),
+            'icon': '⚙️',
+            'is_custom': True
+        }
+        logger.info("已注册自定义功能: %s", name)
 
     async def route(self, func_type: str, text: str,
-                    options: Dict[str, Any] = None) -> str:
+                    options: Mapping[str, Any] = _EMPTY_OPTIONS) -> str:
         """路由到相应的功能处理器"""
-        options = options or {}
-
         try:
-            if func_type == "translate":
-                result = await self.handlers[FunctionType.TRANSLATE](text)
-            elif func_type == "explain":
-                result = await self.handlers[FunctionType.EXPLAIN](text)
-            elif func_type == "summarize":
-                result = await self.handlers[FunctionType.SUMMARIZE](text)
-            elif func_type == "custom":
-                func_name = options.get('function_name', '')
-                result = await self._execute_custom(func_name, text)
-            elif func_type == "chart":
-                chart_type = options.get('chart_type', None)
-                result = await self._execute_chart(text, chart_type)
-            elif func_type == "optimize":
-                recursive = options.get('recursive', False)
-                result = await self._execute_optimize(text, recursive)
-            elif func_type == "ask":
-                question = options.get('question', '')
-                result = await self._execute_ask(text, question)
-            else:
-                result = f"未知功能: {func_type}"
+            execute, is_async = self._dispatch[func_type]
+            result = execute(text, options)
+            if is_async:
+                result = await result
 
             self.result_ready.emit(func_type, result)
             return result
 
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"执行功能 {func_type} 失败: {error_msg}")
-            self.result_ready.emit(func_type, f"错误: {error_msg}")
-            return f"错误: {error_msg}"
-
-    async def _execute_custom(self, func_name: str, text: str) -> str:
-        """执行自定义功能"""
+            return self._report_error(func_type, e)
+
+    def _report_error(self, func_type: str, e: Exception) -> str:
+        """记录执行失败，发出 error_occurred 信号并返回错误结果"""
+        error_msg = str(e)
+        logger.error("执行功能 %s 失败: %s", func_type, error_msg)
+        self.error_occurred.emit(func_type, error_msg)
+        return f"错误: {error_msg}"
+
+    def _execute_custom(self, text: str, options: Mapping[str, Any]) -> str:
+        """执行自定义功能（options['function_name'] 指定功能名）"""
+        func_name = options.get('function_name', '')
         if func_name in self.custom_functions:
             config = self.custom_functions[func_name]
-            prompt = config.get('prompt_template', '{text}')
-            return prompt.replace('{text}', text)
+            return _render_prompt(config.get('prompt_template', '{text}'), text)
         return f"未找到自定义功能: {func_name}"
 
-    async def _execute_chart(self, text: str, chart_type: str = None) -> str:
-        """执行图表生成功能"""
+    async def _execute_chart(self, text: str, options: Mapping[str, Any]) -> str:
+        """执行图表生成功能（options['chart_type'] 指定图表类型）"""
         if FunctionType.CHART not in self.handlers:
             return "错误: 图表处理器未注册"
 
         handler = self.handlers[FunctionType.CHART]
-        result = await handler(text, chart_type)
+        result = await handler(text, options.get('chart_type', None))
         return result
 
-    async def _execute_optimize(self, text: str, recursive: bool = False) -> str:
-        """执行提示词优化功能"""
+    async def _execute_optimize(self, text: str, options: Mapping[str, Any]) -> str:
+        """执行提示词优化功能（options['recursive'] 控制是否递归优化）"""
         if FunctionType.OPTIMIZE not in self.handlers:
             return "错误: 提示词优化处理器未注册"
 
         handler = self.handlers[FunctionType.OPTIMIZE]
-        result = await handler(text, recursive)
+        result = await handler(text, options.get('recursive', False))
         return result
 
-    async def _execute_ask(self, text: str, question: str) -> str:
-        """执行基于文本的提问功能"""
+    async def _execute_ask(self, text: str, options: Mapping[str, Any]) -> str:
+        """执行基于文本的提问功能（options['question'] 为问题）"""
         if FunctionType.ASK not in self.handlers:
             return "错误: 提问处理器未注册"
 
         handler = self.handlers[FunctionType.ASK]
-        result = await handler(text, question)
+        result = await handler(text, options.get('question', ''))
         return result
 
     def get_available_functions(self) -> Dict[str, Dict[str, Any]]:
-        """获取所有可用的功能"""
-        functions = {
-            "translate": {'name': '翻译', 'description': '翻译文本', 'icon': '🔤'},
-            "explain": {'name': '解释', 'description': '解释内容', 'icon': '💡'},
-            "summarize": {'name': '总结', 'description': '总结要点', 'icon': '📝'},
-            "chart": {'name': '绘图', 'description': '根据文本生成图表', 'icon': '📊'},
-            "optimize": {'name': '优化', 'description': '优化提示词', 'icon': '✨'},
-            "ask": {'name': '提问', 'description': '基于文本提问', 'icon': '❓'}
-        }
-
-        for name, config in self.custom_functions.items():
-            functions[f"custom_{name}"] = {
-                'name': config.get('name', name),
-                'description': config.get('description', ''),
-                'icon': '⚙️',
-                'is_custom': True
-            }
-
-        return functions
\ No newline at end of file
+        """获取所有可用的功能（内置功能在前，自定义功能在后）"""
+        return {**_BUILTIN_FUNCTIONS, **self._custom_cache}
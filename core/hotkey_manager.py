@@ -5,6 +5,7 @@
 """
 
 import logging
+import time
 import keyboard
 from PyQt6.QtCore import QObject, pyqtSignal, QEvent, QCoreApplication
 
@@ -16,11 +17,20 @@ class HotkeyManager(QObject):
     
     hotkey_triggered = pyqtSignal(str)
     
-    def __init__(self):
+    def __init__(self, debounce: float = 0.15):
+        """
+        Args:
+            debounce: 防抖时间（秒），该时间内重复触发的热键被忽略
+        """
         super().__init__()
         
         self.registered = False
         self.hotkey_combo = "ctrl+q"  # 默认热键
+        # add_hotkey 返回的注销句柄
+        self._hotkey_handle = None
+        # 防抖：按住或连按热键时只处理第一次，避免重复捕获文本和重复调用 AI
+        self._debounce_s = debounce
+        self._last_fire = 0.0
         
         logger.info(f"热键管理器初始化，使用 {self.hotkey_combo}")
     
@@ -49,7 +59,9 @@ class HotkeyManager(QObject):
         try:
             self.unregister_hotkey()
             
-            keyboard.add_hotkey(self.hotkey_combo, self._on_hotkey)
+            # 传入组合字符串：add_hotkey 会再次解析已解析的元组，把多键组合压平成单步，
+            # 导致单独按下 Ctrl 或 Q 也会触发
+            self._hotkey_handle = keyboard.add_hotkey(self.hotkey_combo, self._on_hotkey)
             
             self.registered = True
             logger.info(f"热键注册成功: {self.hotkey_combo}")
@@ -62,24 +74,33 @@ class HotkeyManager(QObject):
     def unregister_hotkey(self):
         """注销热键"""
         try:
-            if self.registered:
-                keyboard.remove_hotkey(self.hotkey_combo)
+            if self.registered and self._hotkey_handle is not None:
+                # 通过注册时返回的句柄注销，无需按组合字符串再查找
+                keyboard.remove_hotkey(self._hotkey_handle)
                 logger.info("热键已注销")
             
             self.registered = False
+            self._hotkey_handle = None
             
         except Exception as e:
             logger.exception(f"注销热键时发生异常: {e}")
     
     def _on_hotkey(self):
-        """热键被触发 - 直接发送信号"""
+        """热键被触发 - 投递事件到主线程"""
+        now = time.monotonic()
+        if now - self._last_fire < self._debounce_s:
+            return
+        self._last_fire = now
+
         logger.info(f"热键 {self.hotkey_combo} 被触发")
-        # 直接发送信号（keyboard 回调在主线程中执行）
-        self.hotkey_triggered.emit(self.hotkey_combo)
+        # keyboard 回调运行在其监听线程中：投递事件到 Qt 事件队列，
+        # 由主线程的 customEvent 发出信号，避免跨线程直接发射信号。
+        # postEvent 会接管事件对象的所有权，因此每次触发创建新事件
+        QCoreApplication.postEvent(self, _HotkeyEvent(self.hotkey_combo))
     
     def customEvent(self, event):
-        """处理自定义事件"""
-        if isinstance(event, _HotkeyEvent):
+        """处理自定义事件（在主线程中执行）"""
+        if event.type() == _HotkeyEvent.EVENT_TYPE:
             self.hotkey_triggered.emit(event.hotkey)
     
     def __del__(self):
@@ -88,8 +109,8 @@ class HotkeyManager(QObject):
 
 class _HotkeyEvent(QEvent):
     """热键事件"""
-    _type = QEvent.Type.User + 1
+    EVENT_TYPE = QEvent.Type(QEvent.registerEventType())
     
     def __init__(self, hotkey: str):
-        super().__init__(self._type)
+        super().__init__(self.EVENT_TYPE)
         self.hotkey = hotkey
\ No newline at end of file
@@ -6,16 +6,151 @@
 """
 
 import logging
-import threading
+import concurrent.futures
 import time
 import os
+import shutil
 import tempfile
-from typing import Optional, Callable
+from typing import TYPE_CHECKING, Optional, Callable
 from PyQt6.QtCore import QObject, pyqtSignal
-from PIL import Image, ImageGrab
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# 可选依赖在模块导入时解析一次，缺失时置为 None，捕获时不再重复走导入机制
+try:
+    import win32clipboard
+    import win32con
+    from ctypes import windll, wintypes
+except ImportError:
+    win32clipboard = win32con = windll = None
+else:
+    # 捕获路径上频繁调用的函数预先绑定为模块级名称，避免每次经由 DLL/模块属性查找
+    _GetForegroundWindow = windll.user32.GetForegroundWindow
+    _GetForegroundWindow.restype = wintypes.HWND
+    _keybd_event = windll.user32.keybd_event
+    _GetClipboardSequenceNumber = windll.user32.GetClipboardSequenceNumber
+    _GetClipboardSequenceNumber.restype = wintypes.DWORD
+    _OpenClipboard = win32clipboard.OpenClipboard
+    _CloseClipboard = win32clipboard.CloseClipboard
+    _EmptyClipboard = win32clipboard.EmptyClipboard
+    _IsFmt = win32clipboard.IsClipboardFormatAvailable
+    _GetData = win32clipboard.GetClipboardData
+    _SetData = win32clipboard.SetClipboardData
+    _CF = win32con.CF_UNICODETEXT
+
+try:
+    import keyboard
+except ImportError:
+    keyboard = None
+
+try:
+    import pyperclip
+except ImportError:
+    pyperclip = None
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+# 需要从捕获文本中移除的控制字符（保留 \t、\n、\r），供 str.translate 使用
+_CTRL_TABLE = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f])
+
+# 截图 PNG 的 zlib 压缩级别：截图只用于一次性识别，1 级比默认的 6 级快得多，体积略大
+_SCREENSHOT_COMPRESS_LEVEL = 1
+# 轮换使用的截图文件数
+_SCREENSHOT_SLOTS = 4
+
+
+def _grab_screen() -> "Image.Image":
+    """
+    截取主显示器画面
+
+    安装了 mss 时直接读取其 BGRA 缓冲区构造图像，比 Pillow 的 ImageGrab 快得多；
+    否则退回 ImageGrab。mss 实例绑定创建它的线程，因此每次截图单独创建。
+    PIL 只在截图时导入，纯文本会话不加载。
+    """
+    from PIL import Image, ImageGrab
+
+    if mss is not None:
+        try:
+            with mss.mss() as sct:
+                shot = sct.grab(sct.monitors[1])
+            return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+        except Exception as e:
+            logger.debug(f"mss截图失败，改用ImageGrab: {e}")
+    return ImageGrab.grab()
+
+
+# 异步捕获使用的专用线程池：复用线程，并限制连续按热键时的并发捕获数
+_CAPTURE_POOL: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _get_capture_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """获取捕获线程池（关闭后再次使用时重新创建）"""
+    global _CAPTURE_POOL
+    if _CAPTURE_POOL is None:
+        _CAPTURE_POOL = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2,
+            thread_name_prefix="text-capture"
+        )
+    return _CAPTURE_POOL
+
+
+def _shutdown_capture_pool():
+    """关闭捕获线程池（不等待进行中的捕获），下次使用时重新创建"""
+    global _CAPTURE_POOL
+    pool, _CAPTURE_POOL = _CAPTURE_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+# 发送 Ctrl+C 后等待剪贴板更新的默认最长时间和轮询间隔（秒）
+_CLIPBOARD_WAIT_TIMEOUT = 0.15
+_CLIPBOARD_POLL_INTERVAL = 0.005
+# 无法获知剪贴板是否更新时（非 Windows）的固定等待时间（秒）
+_CLIPBOARD_FIXED_WAIT = 0.05
+
+
+def _wait_clipboard_update(seq_before: int, timeout: float = _CLIPBOARD_WAIT_TIMEOUT) -> bool:
+    """
+    等待剪贴板序列号变化（即剪贴板已被写入），超时返回 False
+
+    剪贴板一更新就返回，不必每次都固定等待；
+    序列号查询不需要打开剪贴板，轮询开销很小。
+    """
+    deadline = time.monotonic() + timeout
+    while _GetClipboardSequenceNumber() == seq_before:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(_CLIPBOARD_POLL_INTERVAL)
+    return True
+
+
+# keybd_event 参数：Ctrl、C 的虚拟键码及按键抬起标志
+_VK_CONTROL = 0x11
+_VK_C = 0x43
+_KEYEVENTF_KEYUP = 0x0002
+
+
+def _send_ctrl_c():
+    """模拟 Ctrl+C：Windows 下直接调用 keybd_event，跳过 keyboard 库的按键解析；失败时退回 keyboard 库"""
+    if windll is not None:
+        try:
+            _keybd_event(_VK_CONTROL, 0, 0, 0)
+            _keybd_event(_VK_C, 0, 0, 0)
+            _keybd_event(_VK_C, 0, _KEYEVENTF_KEYUP, 0)
+            _keybd_event(_VK_CONTROL, 0, _KEYEVENTF_KEYUP, 0)
+            return
+        except Exception as e:
+            if keyboard is None:
+                raise
+            logger.debug(f"keybd_event失败，改用keyboard库: {e}")
+    keyboard.press_and_release('ctrl+c')
+
 
 class TextCapture(QObject):
     """截图捕获引擎
@@ -32,7 +167,13 @@ class TextCapture(QObject):
         self.retry_count = 3
         self.retry_delay = 0.1
         self.max_text_length = 10000
+        # 发送 Ctrl+C 后等待剪贴板更新的最长时间（秒），响应较慢的程序可以调大
+        self.clipboard_wait_timeout = _CLIPBOARD_WAIT_TIMEOUT
         self.temp_dir = tempfile.mkdtemp(prefix="word_assistant_")
+        # 截图轮流写入固定的几个文件，临时目录占用有上限，连续截图也不会重名覆盖
+        self._screenshot_slots = [os.path.join(self.temp_dir, f"screenshot_{i}.png")
+                                  for i in range(_SCREENSHOT_SLOTS)]
+        self._slot = 0
 
     def capture(self, retry: int = None) -> Optional[str]:
         """捕获当前选中的文本"""
@@ -57,11 +198,12 @@ class TextCapture(QObject):
             logger.info("开始截图...")
 
             # 获取屏幕截图
-            screenshot = ImageGrab.grab()
+            screenshot = _grab_screen()
 
-            # 保存到临时文件
-            temp_file = os.path.join(self.temp_dir, f"screenshot_{int(time.time())}.png")
-            screenshot.save(temp_file, "PNG")
+            # 保存到临时文件（轮换使用，调用方需在之后第 _SCREENSHOT_SLOTS 次截图前读取完毕）
+            temp_file = self._screenshot_slots[self._slot]
+            self._slot = (self._slot + 1) % _SCREENSHOT_SLOTS
+            screenshot.save(temp_file, "PNG", compress_level=_SCREENSHOT_COMPRESS_LEVEL)
 
             logger.info(f"截图保存成功: {temp_file}")
             self.image_captured.emit(temp_file)
@@ -79,8 +221,7 @@ class TextCapture(QObject):
             if image_path and callback:
                 callback(image_path)
 
-        thread = threading.Thread(target=capture_task, daemon=True)
-        thread.start()
+        _get_capture_pool().submit(capture_task)
 
     def get_selected_text(self) -> Optional[str]:
         """获取选中的文本"""
@@ -99,59 +240,52 @@ class TextCapture(QObject):
                 if callback:
                     callback(text)
 
-        thread = threading.Thread(target=capture_task, daemon=True)
-        thread.start()
+        _get_capture_pool().submit(capture_task)
 
     def _capture_via_clipboard(self) -> Optional[str]:
         """通过剪贴板捕获文本"""
         # 首先尝试使用 Windows API 直接获取选中文本，避免模拟按键
         try:
-            import win32gui
-            import win32process
-            import win32api
-            import win32clipboard
-            import win32con
-            import ctypes
-            from ctypes import wintypes, windll
+            if win32clipboard is None:
+                raise ImportError("win32clipboard")
 
             # 获取前台窗口句柄
-            hwnd = windll.user32.GetForegroundWindow()
+            hwnd = _GetForegroundWindow()
             if not hwnd:
                 raise Exception("无法获取前台窗口句柄")
 
             # 保存当前剪贴板内容
-            win32clipboard.OpenClipboard()
+            _OpenClipboard()
             try:
                 # 检查是否有文本在剪贴板中
-                if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
-                    saved_clipboard_content = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+                if _IsFmt(_CF):
+                    saved_clipboard_content = _GetData(_CF)
                 else:
                     saved_clipboard_content = ""
             finally:
-                win32clipboard.CloseClipboard()
-
-            # 使用 keyboard 库模拟 Ctrl+C
-            import keyboard
-            keyboard.press_and_release('ctrl+c')
-            time.sleep(0.05)  # 等待剪贴板更新
-
-            # 读取剪贴板中的新内容
-            win32clipboard.OpenClipboard()
+                _CloseClipboard()
+
+            # 模拟 Ctrl+C，并等待剪贴板更新；超时未更新时交给下面的 pyperclip 方法，
+            # 它会再次复制并等待，响应较慢的程序仍有机会写入剪贴板
+            seq_before = _GetClipboardSequenceNumber()
+            _send_ctrl_c()
+            if not _wait_clipboard_update(seq_before, self.clipboard_wait_timeout):
+                raise TimeoutError("等待剪贴板更新超时")
+
+            # 在同一次打开中读取新内容并恢复原始剪贴板内容
+            new_content = None
+            _OpenClipboard()
             try:
-                if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
-                    new_content = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
-
-                    # 如果新内容与保存的内容不同，说明复制了选中文本
-                    if new_content != saved_clipboard_content:
-                        return new_content
+                if _IsFmt(_CF):
+                    new_content = _GetData(_CF)
+                _EmptyClipboard()
+                _SetData(_CF, saved_clipboard_content)
             finally:
-                # 恢复原始剪贴板内容
-                win32clipboard.CloseClipboard()
-                win32clipboard.OpenClipboard()
-                try:
-                    win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, saved_clipboard_content)
-                finally:
-                    win32clipboard.CloseClipboard()
+                _CloseClipboard()
+
+            # 如果新内容与保存的内容不同，说明复制了选中文本
+            if new_content is not None and new_content != saved_clipboard_content:
+                return new_content
 
         except ImportError as e:
             logger.debug(f"pywin32未安装: {e}")
@@ -160,13 +294,18 @@ class TextCapture(QObject):
 
         # 如果 Windows API 方法失败，尝试使用 pyperclip 作为备选方案
         try:
-            import pyperclip
+            if pyperclip is None or (windll is None and keyboard is None):
+                raise ImportError("pyperclip/keyboard")
             saved_content = pyperclip.paste()  # 保存当前剪贴板内容
 
-            # 模拟 Ctrl+C 操作
-            import keyboard
-            keyboard.press_and_release('ctrl+c')
-            time.sleep(0.05)  # 等待剪贴板更新
+            # 模拟 Ctrl+C 操作，并等待剪贴板更新
+            if windll is not None:
+                seq_before = _GetClipboardSequenceNumber()
+                _send_ctrl_c()
+                _wait_clipboard_update(seq_before, self.clipboard_wait_timeout)
+            else:
+                _send_ctrl_c()
+                time.sleep(_CLIPBOARD_FIXED_WAIT)
 
             selected_text = pyperclip.paste()  # 获取新内容
 
@@ -191,8 +330,7 @@ class TextCapture(QObject):
 
         text = text.strip()
 
-        import re
-        text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
+        text = text.translate(_CTRL_TABLE)
 
         if len(text) > self.max_text_length:
             text = text[:self.max_text_length]
@@ -200,9 +338,10 @@ class TextCapture(QObject):
         return text
 
     def cleanup(self):
-        """清理临时文件"""
+        """清理临时文件并关闭捕获线程池"""
+        _shutdown_capture_pool()
+
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
             logger.info("临时文件清理完成")
@@ -1,10 +1,32 @@
 # Features模块初始化
-from .translator import Translator
-from .explainer import Explainer
-from .summarizer import Summarizer
-from .custom_builder import CustomBuilder
-from .vision_explainer import VisionExplainer, get_vision_explainer
-from .chart_generator import ChartGenerator
+# 子模块按需导入（PEP 562）：vision_explainer、chart_generator 等依赖 PIL、aiohttp 等较重的库，
+# 仅使用文本功能的会话不必在启动时加载它们
+import importlib
+
+# 导出名称 -> 所在子模块
+_LAZY_IMPORTS = {
+    'Translator': '.translator',
+    'Explainer': '.explainer',
+    'Summarizer': '.summarizer',
+    'CustomBuilder': '.custom_builder',
+    'VisionExplainer': '.vision_explainer',
+    'get_vision_explainer': '.vision_explainer',
+    'ChartGenerator': '.chart_generator',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     'Translator', 'Explainer', 'Summarizer', 'CustomBuilder', 
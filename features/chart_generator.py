@@ -5,18 +5,138 @@
 使用 LLM 分析文本并生成相应的图表
 """
 
+import asyncio
 import logging
 import hashlib
 import json
+import re
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Any, Optional, AsyncGenerator, Tuple
-from ai.xiaoma_adapter import XiaomaAdapter
+from ai.xiaoma_adapter import OpenAIAdapter
+from ai._response import extract_content
 from utils.local_cache import get_cache_manager
 from utils.chart_dependency_manager import get_dependency_manager
 from utils.chart_code_executor import ChartCodeExecutor
 
 logger = logging.getLogger(__name__)
 
+# 缓存结果的序列化：优先使用 orjson（更快），未安装时使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Any) -> str:
+    """序列化为 JSON 字符串（缓存管理器以字符串存储）"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+
+def _loads(data: str) -> Any:
+    """反序列化 JSON 字符串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# 简单规则检查中表示可绘图内容的关键词模式
+_SIMPLE_CHECK_PATTERNS = (
+    # 数学函数
+    r"sin|cos|tan|log|ln|exp|sqrt|pow",
+    # 统计相关
+    r"正态分布|均匀分布|指数分布|直方图|箱线图|散点图|折线图|柱状图",
+    r"平均数|中位数|方差|标准差|概率",
+    # 数据描述
+    r"数据点|坐标|函数|方程|曲线|图形",
+    # 数学表达式 - 支持 X + Y, Z = X + Y 等格式
+    r"\d+\s*[\+\-\*\/]\s*\d+",  # 简单运算如 1+2, 3*4
+    r"[xyzXYZ]=\s*[\w\+\-\*\/]+",  # 变量赋值如 Z = X + Y, y = sin(x)
+    r"[a-zA-Z]\s*=\s*[a-zA-Z0-9\+\-\*\/\s]+",  # 通用变量赋值
+)
+# 所有模式合并为一个带命名分组的正则，一次扫描即可完成匹配，由 lastgroup 得知命中的模式
+_SIMPLE_CHECK_COMBINED = re.compile(
+    "|".join(f"(?P<g{i}>{p})" for i, p in enumerate(_SIMPLE_CHECK_PATTERNS)),
+    re.IGNORECASE
+)
+# 前 4 个纯关键词模式；后面的表达式/赋值模式都要求文本含数字或 "="，
+# 两者都没有时（普通文字）只需扫描这些关键词，跳过代价高的赋值模式
+_SIMPLE_KEYWORD_PATTERN_COUNT = 4
+_SIMPLE_CHECK_KEYWORDS = re.compile(
+    "|".join(f"(?P<g{i}>{p})" for i, p in enumerate(_SIMPLE_CHECK_PATTERNS[:_SIMPLE_KEYWORD_PATTERN_COUNT])),
+    re.IGNORECASE
+)
+_HAS_NUMBER = re.compile(r'\d')
+# markdown 代码块（```python 或 ```）
+_CODE_BLOCK_RE = re.compile(r'```(?:python)?\s*\n([\s\S]*?)\n```')
+# 无代码块时，第一行看起来像代码的行（之后的内容都视为代码）
+_CODE_START_RE = re.compile(r'^.*(?:import|plt|np\.|print\()', re.MULTILINE)
+# 从代码推断图表类型：一次扫描找出出现的所有绘图调用，再按优先级选择。
+# plot 优先级最低：生成的代码都包含 plt.subplots，否则饼图、箱线图等都会被误判为折线图
+_CHART_TYPE_RE = re.compile(r'scatter|bar|hist|pie|boxplot|imshow|plot')
+_CHART_TYPE_LABELS = (
+    ("scatter", "散点图"),
+    ("bar", "柱状图"),
+    ("hist", "直方图"),
+    ("pie", "饼图"),
+    ("boxplot", "箱线图"),
+    ("imshow", "热力图"),
+    ("plot", "折线图"),
+)
+_DIGITS_RE = re.compile(r'\d+')
+_NUMBER_RE = re.compile(r'[-+]?\d*\.?\d+')
+# 图表代码生成的系统提示词
+_SYSTEM_PROMPT = """你是一个数据可视化专家，根据用户需求生成 Python 绑图代码。
+
+要求：
+1. 只返回可执行的 Python 代码，不要有其他说明
+2. 使用 matplotlib、numpy 和 sklearn 进行绑图
+3. 代码必须完整且可直接运行
+4. 设置合适的中文字体和图表样式
+5. 将图片保存到临时文件，使用全局变量 output_path
+6. 不要调用 matplotlib.use() 或 plt.show()（执行环境已使用 Agg 后端），保存后调用 plt.close(fig)
+
+图表类型选择规则：
+- 2维数据 → 2D图表（折线图、散点图、柱状图、直方图、饼图、箱线图、热力图）
+- 3维数据 → 3D图表（3D散点图、3D曲面图、3D线图）
+- 4+维数据 → 必须先降维再可视化（PCA/t-SNE/特征选择）
+
+降维策略（4+维数据必须）：
+- PCA降维：将数据降至3维用于3D可视化
+- t-SNE降维：非线性降维，适合复杂数据结构
+- 特征选择：选取最重要的3个特征
+
+3D图表代码模板：
+```python
+from mpl_toolkits.mplot3d import Axes3D
+fig = plt.figure(figsize=(10, 8))
+ax = fig.add_subplot(111, projection='3d')
+ax.scatter(x, y, z, c='blue', s=50)
+ax.set_xlabel('X')
+ax.set_ylabel('Y')
+ax.set_zlabel('Z')
+ax.set_title('3D散点图')
+plt.savefig(output_path, dpi=200, bbox_inches='tight', facecolor='white')
+plt.close(fig)
+print(f"IMAGE_SAVED:{output_path}")
+```
+
+2D图表代码模板：
+```python
+import matplotlib.pyplot as plt
+import numpy as np
+fig, ax = plt.subplots(figsize=(10, 8))
+ax.plot(x, y, marker='o')
+ax.set_title('折线图')
+plt.savefig(output_path, dpi=200, bbox_inches='tight', facecolor='white')
+plt.close(fig)
+print(f"IMAGE_SAVED:{output_path}")
+```"""
+
+# 文本中没有足够数字时模拟代码使用的示例数据
+_MOCK_DATA = (1, 2, 3, 4, 5, 4, 3, 2, 1)
+
 
 class ChartGenerator:
     """图表生成功能
@@ -25,7 +145,7 @@ class ChartGenerator:
     支持函数图、统计图、散点图等多种图表类型。
     """
     
-    def __init__(self, adapter: Optional[XiaomaAdapter] = None, 
+    def __init__(self, adapter: Optional[OpenAIAdapter] = None, 
                  enable_cache: bool = True,
                  output_dir: Optional[str] = None):
         """
@@ -45,9 +165,15 @@ class ChartGenerator:
         self.code_executor = ChartCodeExecutor(self.output_dir)
         self.dep_manager = get_dependency_manager()
         
+        # 进程内 LRU 缓存（已解析的结果），命中时无需访问磁盘缓存和反序列化
+        self._mem_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._mem_cache_max = 128
+        
         # 默认配置
         self.default_figsize = (10, 8)
-        self.default_dpi = 400  # 从 300 提升至 400
+        # 光栅化和 PNG 编码耗时与像素数（DPI²）成正比；10x8 英寸下 200 DPI 已是 2000x1600，
+        # 远超弹窗的显示尺寸，无需 400 DPI
+        self.default_dpi = 200
     
     async def can_draw_chart(self, text: str) -> Tuple[bool, str]:
         """
@@ -71,7 +197,7 @@ class ChartGenerator:
             ]
             
             response = await self.adapter.chat(messages)
-            result = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            result = extract_content(response)
             
             # 解析 LLM 返回
             result_lower = result.lower().strip()
@@ -88,28 +214,17 @@ class ChartGenerator:
     
     def _simple_check(self, text: str) -> Tuple[bool, str]:
         """简单的规则检查"""
-        # 可绘图的关键词
-        keywords = [
-            # 数学函数
-            r"sin|cos|tan|log|ln|exp|sqrt|pow",
-            # 统计相关
-            r"正态分布|均匀分布|指数分布|直方图|箱线图|散点图|折线图|柱状图",
-            r"平均数|中位数|方差|标准差|概率",
-            # 数据描述
-            r"数据点|坐标|函数|方程|曲线|图形",
-            # 数学表达式 - 支持 X + Y, Z = X + Y 等格式
-            r"\d+\s*[\+\-\*\/]\s*\d+",  # 简单运算如 1+2, 3*4
-            r"[xyzXYZ]=\s*[\w\+\-\*\/]+",  # 变量赋值如 Z = X + Y, y = sin(x)
-            r"[a-zA-Z]\s*=\s*[a-zA-Z0-9\+\-\*\/\s]+",  # 通用变量赋值
-        ]
-        
-        import re
-        for pattern in keywords:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True, f"匹配关键词模式: {pattern}"
+        # 先做廉价预筛：没有数字也没有 "=" 时只可能命中关键词模式
+        has_numbers = _HAS_NUMBER.search(text) is not None
+        if has_numbers or "=" in text:
+            match = _SIMPLE_CHECK_COMBINED.search(text)
+        else:
+            match = _SIMPLE_CHECK_KEYWORDS.search(text)
+        if match:
+            pattern = _SIMPLE_CHECK_PATTERNS[int(match.lastgroup[1:])]
+            return True, f"匹配关键词模式: {pattern}"
         
         # 检查是否包含数据
-        has_numbers = bool(re.search(r'\d+', text))
         has_text = len(text) > 10
         
         if has_numbers and has_text:
@@ -137,13 +252,21 @@ class ChartGenerator:
             logger.error(f"依赖检查失败: {deps_msg}")
             return {"error": f"依赖安装失败: {deps_msg}"}
         
-        # 2. 检查缓存
-        if self.enable_cache and self.cache_manager:
+        # 2. 检查缓存（先查进程内缓存，再查磁盘缓存）
+        if self.enable_cache:
             cache_key = self._generate_cache_key(text, chart_type)
-            cached = self.cache_manager.get("chart", text, chart_type=chart_type)
-            if cached:
-                logger.debug("图表生成缓存命中")
-                return json.loads(cached)
+            result = self._get_mem_cached(cache_key)
+            if result is not None:
+                logger.debug("图表生成内存缓存命中")
+                return result
+            
+            if self.cache_manager:
+                cached = self.cache_manager.get("chart", text, chart_type=chart_type)
+                if cached:
+                    logger.debug("图表生成缓存命中")
+                    result = _loads(cached)
+                    self._put_mem_cached(cache_key, result)
+                    return dict(result)
         
         # 3. 如果没有 adapter，直接使用 mock 代码（避免 LLM API 调用）
         if not self.adapter:
@@ -163,7 +286,10 @@ class ChartGenerator:
         
         # 4. 执行代码生成图片
         logger.info("开始执行代码生成图片")
-        exec_result = self.code_executor.execute_with_timeout(code)
+        # 执行（含等待超时）是阻塞调用，放到线程中避免卡住事件循环
+        exec_result = await asyncio.get_running_loop().run_in_executor(
+            None, self.code_executor.execute_with_timeout, code
+        )
         if "error" in exec_result:
             logger.error(f"代码执行失败: {exec_result['error']}")
             return exec_result
@@ -179,13 +305,15 @@ class ChartGenerator:
         }
         
         # 5. 缓存结果
-        if self.enable_cache and self.cache_manager:
-            self.cache_manager.set(
-                "chart", text, json.dumps(result),
-                chart_type=chart_type
-            )
-        
-        return result
+        if self.enable_cache:
+            self._put_mem_cached(cache_key, result)
+            if self.cache_manager:
+                self.cache_manager.set(
+                    "chart", text, _dumps(result),
+                    chart_type=chart_type
+                )
+        
+        return dict(result)
     
     async def generate_chart_stream(self, text: str, 
                                    chart_type: Optional[str] = None) -> AsyncGenerator[Dict, None]:
@@ -199,24 +327,52 @@ class ChartGenerator:
         Yields:
             Dict: 包含进度信息的字典
         """
-        # 阶段 1: 分析文本
-        yield {"stage": "analyzing", "message": "正在分析文本内容...", "progress": 10}
-        
-        can_draw, reason = await self.can_draw_chart(text)
-        if not can_draw:
-            yield {"stage": "error", "message": f"无法生成图表: {reason}", "error": True}
-            return
-        
-        # 阶段 2: 依赖检查
-        yield {"stage": "checking_deps", "message": "检查依赖...", "progress": 20}
-        deps_ok, deps_msg = self.dep_manager.ensure_imports()
-        if not deps_ok:
-            yield {"stage": "error", "message": f"依赖检查失败: {deps_msg}", "error": True}
-            return
-        
-        # 阶段 3: 生成代码
-        yield {"stage": "generating_code", "message": "正在生成图表代码...", "progress": 40}
-        code_result = await self._generate_code(text, chart_type)
+        # 内存缓存命中时直接返回结果
+        if self.enable_cache:
+            cached = self._get_mem_cached(self._generate_cache_key(text, chart_type))
+            if cached is not None:
+                yield {
+                    "stage": "complete",
+                    "message": "图表生成完成",
+                    "progress": 100,
+                    "result": {
+                        "image_path": cached["image_path"],
+                        "description": cached["description"],
+                        "chart_type": cached["chart_type"],
+                    }
+                }
+                return
+        
+        # 依赖检查与 LLM 分析互不依赖：在线程中与分析并发执行；
+        # 分析通过后立即开始生成代码，与尚未完成的依赖检查重叠
+        deps_task = asyncio.get_running_loop().run_in_executor(None, self.dep_manager.ensure_imports)
+        code_task = None
+        try:
+            # 阶段 1: 分析文本
+            yield {"stage": "analyzing", "message": "正在分析文本内容...", "progress": 10}
+            
+            can_draw, reason = await self.can_draw_chart(text)
+            if not can_draw:
+                yield {"stage": "error", "message": f"无法生成图表: {reason}", "error": True}
+                return
+            
+            code_task = asyncio.create_task(self._generate_code(text, chart_type))
+            
+            # 阶段 2: 依赖检查
+            yield {"stage": "checking_deps", "message": "检查依赖...", "progress": 20}
+            deps_ok, deps_msg = await deps_task
+            if not deps_ok:
+                yield {"stage": "error", "message": f"依赖检查失败: {deps_msg}", "error": True}
+                return
+            
+            # 阶段 3: 生成代码
+            yield {"stage": "generating_code", "message": "正在生成图表代码...", "progress": 40}
+            code_result = await code_task
+        finally:
+            # 提前结束（无法绘图、依赖缺失或调用方中止）时取消未完成的任务
+            for task in (deps_task, code_task):
+                if task is not None and not task.done():
+                    task.cancel()
         
         if "error" in code_result:
             yield {"stage": "error", "message": code_result["error"], "error": True}
@@ -226,7 +382,9 @@ class ChartGenerator:
         
         # 阶段 4: 执行代码
         yield {"stage": "executing", "message": "正在绘制图表...", "progress": 70}
-        exec_result = self.code_executor.execute_with_timeout(code_result["code"])
+        exec_result = await asyncio.get_running_loop().run_in_executor(
+            None, self.code_executor.execute_with_timeout, code_result["code"]
+        )
         
         if "error" in exec_result:
             yield {"stage": "error", "message": f"绘图失败: {exec_result['error']}", "error": True}
@@ -267,7 +425,7 @@ class ChartGenerator:
             ]
             
             response = await self.adapter.chat(messages)
-            code = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            code = extract_content(response)
             
             # 提取代码块
             code = self._extract_code(code)
@@ -290,49 +448,7 @@ class ChartGenerator:
     
     def _get_system_prompt(self) -> str:
         """获取系统提示词"""
-        return """你是一个数据可视化专家，根据用户需求生成 Python 绑图代码。
-
-要求：
-1. 只返回可执行的 Python 代码，不要有其他说明
-2. 使用 matplotlib、numpy 和 sklearn 进行绑图
-3. 代码必须完整且可直接运行
-4. 设置合适的中文字体和图表样式
-5. 将图片保存到临时文件，使用全局变量 output_path
-
-图表类型选择规则：
-- 2维数据 → 2D图表（折线图、散点图、柱状图、直方图、饼图、箱线图、热力图）
-- 3维数据 → 3D图表（3D散点图、3D曲面图、3D线图）
-- 4+维数据 → 必须先降维再可视化（PCA/t-SNE/特征选择）
-
-降维策略（4+维数据必须）：
-- PCA降维：将数据降至3维用于3D可视化
-- t-SNE降维：非线性降维，适合复杂数据结构
-- 特征选择：选取最重要的3个特征
-
-3D图表代码模板：
-```python
-from mpl_toolkits.mplot3d import Axes3D
-fig = plt.figure(figsize=(10, 8))
-ax = fig.add_subplot(111, projection='3d')
-ax.scatter(x, y, z, c='blue', s=50)
-ax.set_xlabel('X')
-ax.set_ylabel('Y')
-ax.set_zlabel('Z')
-ax.set_title('3D散点图')
-plt.savefig(output_path, dpi=400, bbox_inches='tight', facecolor='white')
-print(f"IMAGE_SAVED:{output_path}")
-```
-
-2D图表代码模板：
-```python
-import matplotlib.pyplot as plt
-import numpy as np
-fig, ax = plt.subplots(figsize=(10, 8))
-ax.plot(x, y, marker='o')
-ax.set_title('折线图')
-plt.savefig(output_path, dpi=400, bbox_inches='tight', facecolor='white')
-print(f"IMAGE_SAVED:{output_path}")
-```"""
+        return _SYSTEM_PROMPT
     
     def _create_code_prompt(self, text: str, chart_type: Optional[str] = None) -> str:
         """创建代码生成提示词"""
@@ -371,33 +487,16 @@ YES/NO
     
     def _extract_code(self, response: str) -> str:
         """从响应中提取代码块"""
-        import re
-        
-        # 尝试提取 markdown 代码块
-        patterns = [
-            r'```python\s*\n([\s\S]*?)\n```',
-            r'```\s*\n([\s\S]*?)\n```',
-        ]
+        # 尝试提取 markdown 代码块，使用第一个包含必要绘图调用的代码块
+        for match in _CODE_BLOCK_RE.finditer(response):
+            code = match.group(1).strip()
+            if "plt.subplots" in code and "plt.savefig" in code:
+                return code
         
-        for pattern in patterns:
-            match = re.search(pattern, response)
-            if match:
-                code = match.group(1).strip()
-                # 确保代码包含必要的导入
-                if "plt.subplots" in code and "plt.savefig" in code:
-                    return code
-        
-        # 如果没有代码块，尝试直接使用响应
+        # 如果没有代码块，尝试直接使用响应：从第一行代码开始截取到末尾
         if "plt.subplots" in response and "plt.savefig" in response:
-            lines = response.split("\n")
-            code_lines = []
-            in_code = False
-            for line in lines:
-                if "import" in line or "plt" in line or "np." in line or "print(" in line:
-                    in_code = True
-                if in_code:
-                    code_lines.append(line)
-            return "\n".join(code_lines)
+            match = _CODE_START_RE.search(response)
+            return response[match.start():] if match else ""
         
         return ""
     
@@ -406,14 +505,14 @@ YES/NO
         """生成模拟代码（无 adapter 时）"""
         import numpy as np
         
-        # 简单分析文本中的数据
-        import re
-        numbers = re.findall(r'[-+]?\d*\.?\d+', text)
+        # 简单分析文本中的数据（数字串由 NumPy 在 C 层一次解析）
+        numbers = _NUMBER_RE.findall(text)
         
         if len(numbers) >= 2:
-            data_list = [float(n) for n in numbers[:10]]
+            data = np.fromstring(' '.join(numbers[:10]), dtype=np.float64, sep=' ')
         else:
-            data_list = [1, 2, 3, 4, 5, 4, 3, 2, 1]
+            data = np.array(_MOCK_DATA, dtype=np.float64)
+        data_list = data.tolist()
         
         # 生成代码 - 使用全局 output_path 变量和类 DPI 设置
         dpi = self.default_dpi
@@ -425,7 +524,7 @@ plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
 plt.rcParams['axes.unicode_minus'] = False
 
 # 数据
-data = {data_list}
+data = np.array({data_list})
 
 # 绑图
 fig, ax = plt.subplots(figsize=(10, 8))
@@ -436,9 +535,10 @@ ax.set_ylabel('值', fontsize=12)
 ax.tick_params(axis='both', labelsize=10)
 ax.grid(True, linestyle='--', alpha=0.7)
 
-# 保存 - 高 DPI ({dpi})
+# 保存 - DPI ({dpi})
 # 使用全局变量 output_path（由执行器传入）
 plt.savefig(output_path, dpi={dpi}, bbox_inches='tight', facecolor='white')
+plt.close(fig)
 print(f"IMAGE_SAVED:{{output_path}}")
 """
         
@@ -455,32 +555,40 @@ print(f"IMAGE_SAVED:{{output_path}}")
         info = {"type": "自定义图表", "description": ""}
         
         # 从代码中推断图表类型
-        if "scatter" in code:
-            info["type"] = "散点图"
-        elif "bar" in code:
-            info["type"] = "柱状图"
-        elif "hist" in code:
-            info["type"] = "直方图"
-        elif "plot" in code:
-            info["type"] = "折线图"
-        elif "pie" in code:
-            info["type"] = "饼图"
-        elif "boxplot" in code:
-            info["type"] = "箱线图"
-        elif "imshow" in code:
-            info["type"] = "热力图"
+        found = set(_CHART_TYPE_RE.findall(code))
+        for token, label in _CHART_TYPE_LABELS:
+            if token in found:
+                info["type"] = label
+                break
         
         # 简单描述
-        import re
-        numbers = re.findall(r'\d+', text[:100])
+        numbers = _DIGITS_RE.findall(text[:100])
         info["description"] = f"基于 {len(numbers)} 个数据点的 {info['type']}"
         
         return info
     
+    def _get_mem_cached(self, key: str) -> Optional[Dict]:
+        """读取进程内缓存（返回副本），命中时移到最近使用位置"""
+        result = self._mem_cache.get(key)
+        if result is None:
+            return None
+        self._mem_cache.move_to_end(key)
+        return dict(result)
+    
+    def _put_mem_cached(self, key: str, result: Dict):
+        """写入进程内缓存，超出容量时淘汰最久未使用的条目"""
+        self._mem_cache[key] = result
+        self._mem_cache.move_to_end(key)
+        if len(self._mem_cache) > self._mem_cache_max:
+            self._mem_cache.popitem(last=False)
+    
     def _generate_cache_key(self, text: str, chart_type: Optional[str]) -> str:
-        """生成缓存键"""
-        content = f"{text}:{chart_type}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """生成缓存键（BLAKE2b-128，比 MD5 更快；分段 update，不拼接中间字符串）"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(text.encode('utf-8'))
+        h.update(b'\x00')
+        h.update((chart_type or '').encode('utf-8'))
+        return h.hexdigest()
     
     def get_supported_types(self) -> list:
         """获取支持的图表类型"""
@@ -4,32 +4,61 @@
 AI辅助自定义功能模块
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, Any, Optional, AsyncGenerator
-from dataclasses import dataclass, asdict
-from ai.xiaoma_adapter import XiaomaAdapter
+import weakref
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, AsyncGenerator
+from dataclasses import dataclass
+from ai.xiaoma_adapter import OpenAIAdapter
+from ai._response import extract_content
 from ai.prompt_generator import PromptGenerator
 
 logger = logging.getLogger(__name__)
 
+# 优先使用 orjson 读写功能文件（直接输出 UTF-8 字节，一次写入），未安装时使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+# 流式输出合批：累计达到该字符数或距上次输出超过该时间（秒）时才向下游产出一次
+_STREAM_BATCH_CHARS = 64
+_STREAM_BATCH_INTERVAL = 0.05
+
+
+@dataclass(frozen=True)
 class CustomFunction:
-    """自定义功能配置"""
+    """自定义功能配置（不可变：内容相同的实例在构建器间共用，见 CustomBuilder._intern）"""
     name: str
     description: str
     prompt_template: str
-    parameters: Optional[Dict[str, Any]] = None
+    parameters: Optional[Mapping[str, Any]] = None
+    
+    def __post_init__(self):
+        # 复制一份并包装为只读视图，调用方之后修改传入的字典不会影响共用的实例
+        if self.parameters is not None:
+            object.__setattr__(self, "parameters", MappingProxyType(dict(self.parameters)))
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        # 字段都是扁平的，直接构造字典，无需 asdict 的递归深拷贝
+        return {
+            "name": self.name,
+            "description": self.description,
+            "prompt_template": self.prompt_template,
+            "parameters": dict(self.parameters) if self.parameters is not None else None,
+        }
 
 
 class CustomBuilder:
     """自定义功能构建器"""
     
-    def __init__(self, adapter: Optional[XiaomaAdapter] = None, 
+    # 内容相同的功能配置在所有构建器间共用同一个实例（弱引用，无人持有时自动回收）
+    _INTERN: "weakref.WeakValueDictionary[tuple, CustomFunction]" = weakref.WeakValueDictionary()
+    
+    def __init__(self, adapter: Optional[OpenAIAdapter] = None, 
                  prompt_generator: Optional[PromptGenerator] = None):
         """
         初始化自定义功能构建器
@@ -58,15 +87,29 @@ class CustomBuilder:
         """
         func_name = name or description.split()[0] if description else "自定义功能"
         
-        func = CustomFunction(
+        func = self._intern(CustomFunction(
             name=func_name,
             description=description,
             prompt_template=self._generate_template(description)
-        )
+        ))
         
         self.custom_functions[func_name] = func
         return func
     
+    @classmethod
+    def _intern(cls, func: CustomFunction) -> CustomFunction:
+        """返回与 func 内容相同的已有实例；参数值不可哈希时不做合并"""
+        try:
+            key = (func.name, func.description, func.prompt_template,
+                   frozenset((func.parameters or {}).items()))
+        except TypeError:
+            return func
+        existing = cls._INTERN.get(key)
+        if existing is not None:
+            return existing
+        cls._INTERN[key] = func
+        return func
+    
     def _generate_template(self, description: str) -> str:
         """生成提示词模板"""
         return f"""你是一个{description}助手。
@@ -110,16 +153,16 @@ class CustomBuilder:
             ]
             
             response = await self.adapter.chat(messages)
-            content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            content = extract_content(response)
             
             # 尝试解析JSON
             try:
-                # 提取JSON部分
-                import re
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    result = json.loads(json_match.group())
-                    return result
+                # 提取JSON部分：第一个 "{" 到最后一个 "}"（与贪婪匹配 \{[\s\S]*\} 等价，但无需正则）
+                start = content.find('{')
+                end = content.rfind('}')
+                if start != -1 and end > start:
+                    payload = content[start:end + 1]
+                    return orjson.loads(payload) if orjson is not None else json.loads(payload)
             except:
                 pass
             
@@ -175,15 +218,32 @@ class CustomBuilder:
                 {"role": "user", "content": user_prompt}
             ]
             
-            # 调用流式API
+            # 调用流式API，按字符数/时间间隔合批后再产出，避免每个 token 都构造一次字典
+            loop = asyncio.get_running_loop()
+            buf = []
+            buf_len = 0
+            last = loop.time()
             async for chunk in self.adapter.stream_chat(messages):
                 if "error" in chunk:
+                    if buf:
+                        yield {"content": "".join(buf), "delta": True}
+                        buf.clear()
                     yield chunk
                     break
                 
                 content = chunk.get("content", "")
                 if content:
-                    yield {"content": content, "delta": True}
+                    buf.append(content)
+                    buf_len += len(content)
+                    now = loop.time()
+                    if buf_len >= _STREAM_BATCH_CHARS or now - last >= _STREAM_BATCH_INTERVAL:
+                        yield {"content": "".join(buf), "delta": True}
+                        buf.clear()
+                        buf_len = 0
+                        last = now
+            
+            if buf:
+                yield {"content": "".join(buf), "delta": True}
                     
         except Exception as e:
             logger.error(f"流式执行失败: {e}")
@@ -191,24 +251,25 @@ class CustomBuilder:
     
     def save_functions(self, file_path: str):
         """保存自定义功能到文件"""
-        import json
         data = {
             name: func.to_dict() 
             for name, func in self.custom_functions.items()
         }
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            Path(file_path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         logger.info(f"已保存 {len(data)} 个自定义功能")
     
     def load_functions(self, file_path: str):
         """从文件加载自定义功能"""
-        import json
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for name, config in data.items():
-                    self.custom_functions[name] = CustomFunction(**config)
-                logger.info(f"已加载 {len(self.custom_functions)} 个自定义功能")
+            raw = Path(file_path).read_bytes()
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            for name, config in data.items():
+                self.custom_functions[name] = self._intern(CustomFunction(**config))
+            logger.info(f"已加载 {len(self.custom_functions)} 个自定义功能")
         except FileNotFoundError:
             logger.warning(f"文件不存在: {file_path}")
         except Exception as e:
@@ -234,26 +295,22 @@ class CustomBuilder:
     def _load_builtin_functions(self):
         """加载内置自定义功能"""
         # Python代码讲解功能
-        python_explainer = CustomFunction(
+        python_explainer = self._intern(CustomFunction(
             name="python_explainer",
             description="Python代码讲解",
-            prompt_template=self._get_python_explainer_template(),
+            prompt_template=self.prompt_generator.get_prompt(
+                "python_explainer",
+                "{{text}}",
+                {"sub_type": "default"}
+            ),
             parameters={
                 "sub_type": "default",  # default, beginner, advanced
                 "language": "python"
             }
-        )
+        ))
         self.custom_functions["python_explainer"] = python_explainer
         logger.info("已加载内置功能: python_explainer")
     
-    def _get_python_explainer_template(self) -> str:
-        """获取Python代码讲解提示词模板"""
-        return self.prompt_generator.get_prompt(
-            "python_explainer",
-            "{{text}}",
-            {"sub_type": "default"}
-        )
-
     async def execute_simple(self, prompt: str, model: Optional[str] = None) -> str:
         """
         简单执行自定义功能
@@ -288,9 +345,13 @@ class CustomBuilder:
             else:
                 response = await self.adapter.chat(messages)
 
-            content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            content = extract_content(response)
             return content
 
         except Exception as e:
             logger.error(f"简单执行失败: {e}")
             return f"执行失败: {e}"
+
+
+# 导出
+__all__ = ['CustomFunction', 'CustomBuilder']
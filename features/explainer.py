@@ -5,29 +5,56 @@
 """
 
 import logging
-from typing import Dict, Any, Optional, AsyncGenerator
-from ai.xiaoma_adapter import XiaomaAdapter
+from typing import Dict, Any, List, Optional, AsyncGenerator
+from ai.xiaoma_adapter import OpenAIAdapter
+from ai._response import extract_content
+from ai._hedge import chat_first_success
 from utils.local_cache import get_cache_manager
+from utils.semantic_cache import SemanticCache, get_semantic_cache
+from utils.async_lru import async_lru_cache, chat_method_key
 
 logger = logging.getLogger(__name__)
 
+# 系统提示词：详细程度 + 受众提示
+_LEVEL_PROMPTS = {
+    "simple": "请简单解释文本的核心含义，用通俗易懂的语言。",
+    "medium": "请详细解释文本的背景、含义和要点。",
+    "detailed": "请全面解释文本，包括背景、含义、使用场景、示例和相关知识。"
+}
+_AUDIENCE_HINTS = {
+    "beginner": "假设读者是初学者，需要从基础讲起。",
+    "general": "假设读者有一定了解，保持适中的深度。",
+    "expert": "假设读者是专家，可以深入讨论技术细节。"
+}
+# 所有组合预先拼好：每次请求不再构造字典和格式化，且相同组合的系统提示词始终是同一字符串
+_SYSTEM_PROMPTS = {
+    (level, audience): f"{level_prompt} {hint}"
+    for level, level_prompt in _LEVEL_PROMPTS.items()
+    for audience, hint in _AUDIENCE_HINTS.items()
+}
+
 
 class Explainer:
     """解释功能"""
     
-    def __init__(self, adapter: Optional[XiaomaAdapter] = None, enable_cache: bool = True):
+    def __init__(self, adapter: Optional[OpenAIAdapter] = None, enable_cache: bool = True,
+                 fallback_adapters: Optional[List[OpenAIAdapter]] = None):
         """
         初始化解释功能
         
         Args:
             adapter: API适配器实例
             enable_cache: 是否启用缓存
+            fallback_adapters: 备用适配器列表；提供时同一请求并发发给主适配器和备用适配器，取最先成功的响应
         """
         self.adapter = adapter
+        self.fallback_adapters = list(fallback_adapters or [])
         self.detail_level = "medium"
         self.audience = "general"
         self.enable_cache = enable_cache
         self.cache_manager = get_cache_manager() if enable_cache else None
+        # 精确缓存未命中时再查语义缓存（措辞相近的请求复用结果）
+        self.semantic_cache = get_semantic_cache() if enable_cache else SemanticCache(enabled=False)
     
     async def explain(self, text: str, detail_level: Optional[str] = None, 
                       audience: Optional[str] = None) -> str:
@@ -59,6 +86,13 @@ class Explainer:
                 logger.debug(f"解释缓存命中: {text[:50]}...")
                 return cached_result
         
+        # 检查语义缓存
+        namespace = SemanticCache.namespace_for("explain", self.adapter, detail_level, audience)
+        cached_result = await self.semantic_cache.lookup_async(text, namespace)
+        if cached_result is not None:
+            logger.debug(f"解释语义缓存命中: {text[:50]}...")
+            return cached_result
+        
         try:
             prompt = self._create_prompt(text, detail_level, audience)
             
@@ -67,8 +101,8 @@ class Explainer:
                 {"role": "user", "content": prompt}
             ]
             
-            response = await self.adapter.chat(messages)
-            result = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            response = await self._chat(messages)
+            result = extract_content(response)
             
             # 缓存结果
             if self.enable_cache and self.cache_manager:
@@ -77,6 +111,9 @@ class Explainer:
                     detail_level=detail_level,
                     audience=audience
                 )
+            # 适配器以错误字典返回失败时，其中的提示文案不能作为语义相近请求的结果
+            if "error" not in response:
+                await self.semantic_cache.add_async(text, result.strip(), namespace)
             
             return result.strip()
             
@@ -117,6 +154,14 @@ class Explainer:
                 yield {"content": cached_result, "delta": False, "from_cache": True}
                 return
         
+        # 检查语义缓存
+        namespace = SemanticCache.namespace_for("explain", self.adapter, detail_level, audience)
+        cached_result = await self.semantic_cache.lookup_async(text, namespace)
+        if cached_result is not None:
+            logger.debug(f"解释语义缓存命中（流式）: {text[:50]}...")
+            yield {"content": cached_result, "delta": False, "from_cache": True}
+            return
+        
         try:
             prompt = self._create_prompt(text, detail_level, audience)
             
@@ -126,16 +171,19 @@ class Explainer:
             ]
             
             # 调用流式API
-            full_result = ""
+            parts = []
+            failed = False
             async for chunk in self.adapter.stream_chat(messages):
                 if "error" in chunk:
+                    failed = True
                     yield chunk
                     break
                 
                 content = chunk.get("content", "")
                 if content:
-                    full_result += content
+                    parts.append(content)
                     yield {"content": content, "delta": True}
+            full_result = "".join(parts)
             
             # 缓存完整结果
             if self.enable_cache and self.cache_manager and full_result:
@@ -144,26 +192,25 @@ class Explainer:
                     detail_level=detail_level,
                     audience=audience
                 )
+            if not failed:
+                await self.semantic_cache.add_async(text, full_result, namespace)
                     
         except Exception as e:
             logger.error(f"流式解释失败: {e}")
             yield {"error": str(e)}
     
+    @async_lru_cache(maxsize=1024, ttl=3600, key=chat_method_key)
+    async def _chat(self, messages: list) -> Dict[str, Any]:
+        """调用聊天接口（相同模型和消息在有效期内直接复用响应）"""
+        return await chat_first_success([self.adapter, *self.fallback_adapters], messages)
+    
     def _get_system_prompt(self, detail_level: str, audience: str) -> str:
         """获取系统提示词"""
-        level_prompts = {
-            "simple": "请简单解释文本的核心含义，用通俗易懂的语言。",
-            "medium": "请详细解释文本的背景、含义和要点。",
-            "detailed": "请全面解释文本，包括背景、含义、使用场景、示例和相关知识。"
-        }
-        
-        audience_hints = {
-            "beginner": "假设读者是初学者，需要从基础讲起。",
-            "general": "假设读者有一定了解，保持适中的深度。",
-            "expert": "假设读者是专家，可以深入讨论技术细节。"
-        }
-        
-        return f"{level_prompts.get(detail_level, level_prompts['medium'])} {audience_hints.get(audience, '')}"
+        prompt = _SYSTEM_PROMPTS.get((detail_level, audience))
+        if prompt is None:
+            # 未知的级别或受众：级别回退到 medium，受众提示留空
+            prompt = f"{_LEVEL_PROMPTS.get(detail_level, _LEVEL_PROMPTS['medium'])} {_AUDIENCE_HINTS.get(audience, '')}"
+        return prompt
     
     def _create_prompt(self, text: str, detail_level: str, 
                        audience: str) -> str:
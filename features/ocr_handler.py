@@ -7,16 +7,52 @@ OCR处理模块
 
 import logging
 import asyncio
+import concurrent.futures
 import os
-from typing import Optional, List, Dict, Any
+import threading
+import weakref
+from functools import cached_property
+from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
-from .vision_explainer import VisionExplainer
 
 # 添加项目根目录到路径以便加载配置
 PROJECT_ROOT = Path(__file__).parent.parent
+SETTINGS_PATH = PROJECT_ROOT / "config" / "settings.yaml"
 
 logger = logging.getLogger(__name__)
 
+# 支持的识别语言
+_SUPPORTED_LANGUAGES = (
+    "auto", "中文", "英文", "日文", "韩文", "法文", "德文",
+    "西班牙文", "意大利文", "俄文", "阿拉伯文", "葡萄牙文"
+)
+# 能力项：全部由 AI 视觉模型提供，可用性相同
+_CAPABILITY_NAMES = (
+    "basic_ocr", "advanced_analysis", "image_qa",
+    "text_translation", "document_structure", "handwriting_recognition"
+)
+
+# 同步识别接口等待后台事件循环返回结果的最长时间（秒）
+_SYNC_RECOGNIZE_TIMEOUT = 120
+
+# 已解析的配置：(mtime, 大小, 数据)，文件未变化时重建处理器无需再读盘和解析
+_settings_cache: Optional[Tuple[float, int, Dict[str, Any]]] = None
+
+
+def _load_settings() -> Dict[str, Any]:
+    """读取 settings.yaml（按 mtime 和大小缓存，优先使用 libyaml 的 C 加载器），返回共享的只读字典"""
+    global _settings_cache
+    st = SETTINGS_PATH.stat()
+    cached = _settings_cache
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return cached[2]
+
+    import yaml
+    with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+    _settings_cache = (st.st_mtime, st.st_size, data)
+    return data
+
 
 class OCRHandler:
     """智能OCR处理类
@@ -40,18 +76,19 @@ class OCRHandler:
     def _load_config(self):
         """同步加载配置"""
         try:
-            import yaml
-            config_path = PROJECT_ROOT / "config" / "settings.yaml"
-            if config_path.exists():
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    return yaml.safe_load(f) or {}
+            if SETTINGS_PATH.exists():
+                return _load_settings()
         except Exception as e:
             logger.error(f"加载OCR配置失败: {e}")
         return {}
 
     def _init_ocr(self):
         """初始化OCR引擎"""
+        self.__dict__.pop('capabilities', None)
         try:
+            # 按需导入：vision_explainer 会加载 aiohttp、PIL，只导入本模块（如读取配置）时不需要
+            from .vision_explainer import VisionExplainer
+
             # 初始化视觉解释器（基于AI模型）
             self.vision_explainer = VisionExplainer(self.api_adapter)
 
@@ -106,6 +143,31 @@ class OCRHandler:
             logger.error(f"OCR识别失败: {e}", exc_info=True)
             return None
 
+    async def recognize_from_bytes(self, image_data: bytes, language: str = "auto",
+                                   use_ai: bool = True) -> Optional[str]:
+        """
+        从内存中的图像数据识别文字（无需先写入临时文件）
+
+        Args:
+            image_data: 编码后的图像数据（PNG/JPEG 等）
+            language: 识别语言（auto/中文/英文等）
+            use_ai: 是否使用AI模型（默认True）
+
+        Returns:
+            识别出的文字，如果失败则返回None
+        """
+        try:
+            if use_ai and self._check_ai_availability():
+                logger.info(f"使用AI模型识别文字: <内存图像 {len(image_data)} 字节>")
+                return await self.vision_explainer.recognize_text(image_data, language)
+            else:
+                logger.warning("AI模型不可用，使用基础识别")
+                return await self._basic_ocr_fallback("<内存图像>")
+
+        except Exception as e:
+            logger.error(f"OCR识别失败: {e}", exc_info=True)
+            return None
+
     async def _basic_ocr_fallback(self, image_path: str) -> str:
         """基础OCR回退实现"""
         try:
@@ -178,7 +240,9 @@ class OCRHandler:
             logger.error(f"图像文字翻译失败: {e}", exc_info=True)
             return None
 
-    def recognize_from_pil_image(self, pil_image, language: str = "auto", use_ai: bool = True) -> Optional[str]:
+    def recognize_from_pil_image(self, pil_image, language: str = "auto", use_ai: bool = True,
+                                 image_format: str = "JPEG",
+                                 timeout: float = _SYNC_RECOGNIZE_TIMEOUT) -> Optional[str]:
         """
         从PIL图像对象识别文字
 
@@ -186,70 +250,104 @@ class OCRHandler:
             pil_image: PIL图像对象
             language: 识别语言
             use_ai: 是否使用AI模型
+            image_format: 上传的图像格式；默认 JPEG（质量 85，体积通常只有 PNG 的几分之一），
+                线条图、表格等需要无损时传 "PNG"
+            timeout: 等待识别结果的最长时间（秒），超时返回 None
 
         Returns:
             识别出的文字，如果失败则返回None
+
+        Raises:
+            RuntimeError: 在后台事件循环中调用（同步等待自身循环上的任务会永久阻塞）
         """
         import io
-        import tempfile
+        from utils.event_loop_manager import EventLoopManager
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is not None and running_loop is EventLoopManager.get_background_loop():
+            raise RuntimeError("不能在后台事件循环中调用 recognize_from_pil_image()，请改为 await recognize_from_bytes()")
 
+        future = None
         try:
-            # 保存PIL图像到临时文件
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                pil_image.save(tmp_file.name)
-                tmp_path = tmp_file.name
+            # 在内存中编码，直接交给视觉模型，省去临时文件的写入、读回和删除
+            buf = io.BytesIO()
+            if image_format.upper() in ("JPEG", "JPG"):
+                # JPEG 不支持透明通道：铺到白色背景上再编码
+                if pil_image.mode in ("RGBA", "LA"):
+                    from PIL import Image
+                    background = Image.new("RGB", pil_image.size, "white")
+                    background.paste(pil_image, mask=pil_image.split()[-1])
+                    pil_image = background
+                elif pil_image.mode != "RGB":
+                    pil_image = pil_image.convert("RGB")
+                pil_image.save(buf, format="JPEG", quality=85, optimize=True, progressive=True)
+            else:
+                pil_image.save(buf, format=image_format)
 
-            # 使用异步方法
-            result = asyncio.run(self.recognize_from_image(tmp_path, language, use_ai))
-            return result
+            # 提交到常驻的后台事件循环执行：asyncio.run 在已有运行中循环的线程里会抛出 RuntimeError，
+            # 且每次新建、销毁事件循环，绑定在循环上的 HTTP 会话和连接无法复用
+            future = EventLoopManager.submit(self.recognize_from_bytes(buf.getvalue(), language, use_ai))
+            return future.result(timeout=timeout)
 
+        except concurrent.futures.TimeoutError:
+            if future is not None:
+                future.cancel()
+            logger.error(f"PIL图像OCR超时（{timeout}秒）")
+            return None
         except Exception as e:
             logger.error(f"PIL图像OCR失败: {e}", exc_info=True)
             return None
-        finally:
-            # 清理临时文件
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
 
     def is_available(self) -> bool:
         """检查OCR是否可用"""
         return self._check_ai_availability()
 
-    def get_supported_languages(self) -> List[str]:
+    def get_supported_languages(self) -> Tuple[str, ...]:
         """获取支持的语言列表"""
-        return [
-            "auto", "中文", "英文", "日文", "韩文", "法文", "德文",
-            "西班牙文", "意大利文", "俄文", "阿拉伯文", "葡萄牙文"
-        ]
+        return _SUPPORTED_LANGUAGES
+
+    @cached_property
+    def capabilities(self) -> Dict[str, bool]:
+        """功能能力列表（可用性只检查一次；_init_ocr 重新初始化时失效）"""
+        available = self._check_ai_availability()
+        return dict.fromkeys(_CAPABILITY_NAMES, available)
 
     def get_capabilities(self) -> Dict[str, bool]:
         """获取功能能力列表"""
-        return {
-            "basic_ocr": self.is_available(),
-            "advanced_analysis": self._check_ai_availability(),
-            "image_qa": self._check_ai_availability(),
-            "text_translation": self._check_ai_availability(),
-            "document_structure": self._check_ai_availability(),
-            "handwriting_recognition": self._check_ai_availability()
-        }
+        return dict(self.capabilities)
 
 
-# 全局OCR处理器实例（带适配器参数）
-_ocr_handler = None
+# 全局OCR处理器实例：每个事件循环一个（无运行中循环的同步调用共用一个），
+# 不同线程中的事件循环不会互相替换对方正在使用的实例；循环被回收后对应条目自动移除
+_ocr_handlers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OCRHandler]" = weakref.WeakKeyDictionary()
+_sync_ocr_handler: Optional[OCRHandler] = None
+_ocr_handler_lock = threading.Lock()
 
 
 def get_ocr_handler(api_adapter=None):
     """获取OCR处理器实例
 
     Args:
-        api_adapter: API适配器实例
+        api_adapter: API适配器实例（与当前实例的适配器不同时重新创建）
 
     Returns:
         OCRHandler: OCR处理器实例
     """
-    global _ocr_handler
-    if _ocr_handler is None or (_ocr_handler.api_adapter != api_adapter):
-        _ocr_handler = OCRHandler(api_adapter)
-    return _ocr_handler
\ No newline at end of file
+    global _sync_ocr_handler
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _ocr_handler_lock:
+        handler = _ocr_handlers.get(loop) if loop is not None else _sync_ocr_handler
+        if handler is None or handler.api_adapter is not api_adapter:
+            handler = OCRHandler(api_adapter)
+            if loop is not None:
+                _ocr_handlers[loop] = handler
+            else:
+                _sync_ocr_handler = handler
+        return handler
@@ -5,27 +5,116 @@
 """
 
 import logging
-from typing import Dict, Any, Optional, AsyncGenerator
-from ai.xiaoma_adapter import XiaomaAdapter
+from typing import Dict, Any, List, Optional, AsyncGenerator
+from ai.xiaoma_adapter import OpenAIAdapter
+from ai._response import extract_content
+from ai._hedge import chat_first_success
 from utils.local_cache import get_cache_manager
+from utils.semantic_cache import SemanticCache, get_semantic_cache
+from utils.async_lru import async_lru_cache, chat_method_key
 
 logger = logging.getLogger(__name__)
 
+# 优化请求模板：整段固定文本只在导入时构建一次，请求时直接拼接待优化文本
+_RECURSIVE_HEAD = """请优化以下内容，使其成为高质量的提示词优化助手指令：
+
+**优化准则**
+1. **句式规范**  
+   - 统一采用"动词 + 宾语"结构（如"提取关键词""重写句子"）  
+   - 禁止出现主语（如"你""用户""系统"等代词）
+
+2. **框架强化**  
+   - 明确定义：
+     - **输入**：原始提示词文本（由 `{text}` 提供）
+     - **输出**：符合结构化标准的优化版提示词（Markdown 格式）
+     - **边界**：仅重构表达，不增删功能或意图
+     - **约束**：保留原始关键术语与核心目标
+
+3. **清晰度提升**
+   - 替换模糊表达（如"更好""优化一下"）为具体动作动词：
+     - ✅ 使用："重构""拆分""替换""明确""限定""标准化"
+     - ❌ 禁用："改进""弄好""调整一下"
+
+4. **模型友好性**
+   - 输出为结构化 Markdown，无冗余解释
+   - 逻辑分层清晰，使用标题、列表、代码块等增强可解析性
+   - 避免修辞性描述、情感化表达或抽象建议
+
+**输出格式**
+```markdown
+# 优化后的提示词优化助手
+[在此插入优化后的完整提示词优化助手内容]
+
+---
+**优化逻辑**：[一句话说明核心重构策略，聚焦表达形式的工程化升级]
+**约束**：保留原始意图与关键术语，仅重构表达形式
+```
+
+**待优化的提示词优化助手**
+"""
+_RECURSIVE_TAIL = """
+
+优化后的提示词优化助手："""
+_PLAIN_HEAD = """请对以下内容进行语言与结构优化，使其成为高质量的提示词：
+
+**优化准则**
+1. **句式规范**  
+   - 统一采用"动词 + 宾语"结构（如"提取关键词""重写句子"）  
+   - 禁止出现主语（如"你""用户""系统"等代词）
+
+2. **框架强化**  
+   - 明确定义：
+     - **输入**：原始提示词文本（由 `{text}` 提供）
+     - **输出**：符合结构化标准的优化版提示词（Markdown 格式）
+     - **边界**：仅重构表达，不增删功能或意图
+     - **约束**：保留原始关键术语与核心目标
+
+3. **清晰度提升**
+   - 替换模糊表达（如"更好""优化一下"）为具体动作动词：
+     - ✅ 使用："重构""拆分""替换""明确""限定""标准化"
+     - ❌ 禁用："改进""弄好""调整一下"
+
+4. **模型友好性**
+   - 输出为结构化 Markdown，无冗余解释
+   - 逻辑分层清晰，使用标题、列表、代码块等增强可解析性
+   - 避免修辞性描述、情感化表达或抽象建议
+
+**输出格式**
+```markdown
+# 优化后的提示词
+[在此插入优化后的完整提示词内容]
+
+---
+**优化逻辑**：[一句话说明核心重构策略，聚焦表达形式的工程化升级]
+**约束**：保留原始意图与关键术语，仅重构表达形式
+```
+
+**待优化的提示词**
+"""
+_PLAIN_TAIL = """
+
+优化后的提示词："""
+
 
 class PromptOptimizer:
     """提示词优化功能"""
 
-    def __init__(self, adapter: Optional[XiaomaAdapter] = None, enable_cache: bool = True):
+    def __init__(self, adapter: Optional[OpenAIAdapter] = None, enable_cache: bool = True,
+                 fallback_adapters: Optional[List[OpenAIAdapter]] = None):
         """
         初始化提示词优化功能
 
         Args:
             adapter: API适配器实例
             enable_cache: 是否启用缓存
+            fallback_adapters: 备用适配器列表；提供时同一请求并发发给主适配器和备用适配器，取最先成功的响应
         """
         self.adapter = adapter
+        self.fallback_adapters = list(fallback_adapters or [])
         self.enable_cache = enable_cache
         self.cache_manager = get_cache_manager() if enable_cache else None
+        # 精确缓存未命中时再查语义缓存（措辞相近的请求复用结果）
+        self.semantic_cache = get_semantic_cache() if enable_cache else SemanticCache(enabled=False)
 
     async def optimize(self, text: str, recursive: bool = False) -> str:
         """
@@ -51,6 +140,13 @@ class PromptOptimizer:
                 logger.debug(f"提示词优化缓存命中: {text[:50]}...")
                 return cached_result
 
+        # 检查语义缓存
+        namespace = SemanticCache.namespace_for("optimize", self.adapter, recursive)
+        cached_result = await self.semantic_cache.lookup_async(text, namespace)
+        if cached_result is not None:
+            logger.debug(f"提示词优化语义缓存命中: {text[:50]}...")
+            return cached_result
+
         try:
             # 创建优化提示词
             prompt = self._create_optimization_prompt(text, recursive)
@@ -63,8 +159,8 @@ class PromptOptimizer:
                 {"role": "user", "content": prompt}
             ]
 
-            response = await self.adapter.chat(messages)
-            result = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            response = await self._chat(messages)
+            result = extract_content(response)
 
             # 缓存结果
             if self.enable_cache and self.cache_manager:
@@ -72,6 +168,9 @@ class PromptOptimizer:
                     "optimize", text, result.strip(),
                     recursive=recursive
                 )
+            # 错误字典中的提示文案不写入语义缓存
+            if "error" not in response:
+                await self.semantic_cache.add_async(text, result.strip(), namespace)
 
             return result.strip()
 
@@ -106,6 +205,14 @@ class PromptOptimizer:
                 yield {"content": cached_result, "delta": False, "from_cache": True}
                 return
 
+        # 检查语义缓存
+        namespace = SemanticCache.namespace_for("optimize", self.adapter, recursive)
+        cached_result = await self.semantic_cache.lookup_async(text, namespace)
+        if cached_result is not None:
+            logger.debug(f"提示词优化语义缓存命中（流式）: {text[:50]}...")
+            yield {"content": cached_result, "delta": False, "from_cache": True}
+            return
+
         try:
             # 创建优化提示词
             prompt = self._create_optimization_prompt(text, recursive)
@@ -119,16 +226,19 @@ class PromptOptimizer:
             ]
 
             # 调用流式API
-            full_result = ""
+            parts = []
+            failed = False
             async for chunk in self.adapter.stream_chat(messages):
                 if "error" in chunk:
+                    failed = True
                     yield chunk
                     break
 
                 content = chunk.get("content", "")
                 if content:
-                    full_result += content
+                    parts.append(content)
                     yield {"content": content, "delta": True}
+            full_result = "".join(parts)
 
             # 缓存完整结果
             if self.enable_cache and self.cache_manager and full_result:
@@ -136,11 +246,18 @@ class PromptOptimizer:
                     "optimize", text, full_result,
                     recursive=recursive
                 )
+            if not failed:
+                await self.semantic_cache.add_async(text, full_result, namespace)
 
         except Exception as e:
             logger.error(f"流式提示词优化失败: {e}")
             yield {"error": str(e)}
 
+    @async_lru_cache(maxsize=1024, ttl=3600, key=chat_method_key)
+    async def _chat(self, messages: list) -> Dict[str, Any]:
+        """调用聊天接口（相同模型和消息在有效期内直接复用响应）"""
+        return await chat_first_success([self.adapter, *self.fallback_adapters], messages)
+
     def _get_system_prompt(self, recursive: bool) -> str:
         """获取系统提示词"""
         if recursive:
@@ -155,83 +272,8 @@ class PromptOptimizer:
     def _create_optimization_prompt(self, text: str, recursive: bool) -> str:
         """创建优化提示词"""
         if recursive:
-            return f"""请优化以下内容，使其成为高质量的提示词优化助手指令：
-
-**优化准则**
-1. **句式规范**  
-   - 统一采用"动词 + 宾语"结构（如"提取关键词""重写句子"）  
-   - 禁止出现主语（如"你""用户""系统"等代词）
-
-2. **框架强化**  
-   - 明确定义：
-     - **输入**：原始提示词文本（由 `{{text}}` 提供）
-     - **输出**：符合结构化标准的优化版提示词（Markdown 格式）
-     - **边界**：仅重构表达，不增删功能或意图
-     - **约束**：保留原始关键术语与核心目标
-
-3. **清晰度提升**
-   - 替换模糊表达（如"更好""优化一下"）为具体动作动词：
-     - ✅ 使用："重构""拆分""替换""明确""限定""标准化"
-     - ❌ 禁用："改进""弄好""调整一下"
-
-4. **模型友好性**
-   - 输出为结构化 Markdown，无冗余解释
-   - 逻辑分层清晰，使用标题、列表、代码块等增强可解析性
-   - 避免修辞性描述、情感化表达或抽象建议
-
-**输出格式**
-```markdown
-# 优化后的提示词优化助手
-[在此插入优化后的完整提示词优化助手内容]
-
----
-**优化逻辑**：[一句话说明核心重构策略，聚焦表达形式的工程化升级]
-**约束**：保留原始意图与关键术语，仅重构表达形式
-```
-
-**待优化的提示词优化助手**
-{text}
-
-优化后的提示词优化助手："""
-
-        return f"""请对以下内容进行语言与结构优化，使其成为高质量的提示词：
-
-**优化准则**
-1. **句式规范**  
-   - 统一采用"动词 + 宾语"结构（如"提取关键词""重写句子"）  
-   - 禁止出现主语（如"你""用户""系统"等代词）
-
-2. **框架强化**  
-   - 明确定义：
-     - **输入**：原始提示词文本（由 `{{text}}` 提供）
-     - **输出**：符合结构化标准的优化版提示词（Markdown 格式）
-     - **边界**：仅重构表达，不增删功能或意图
-     - **约束**：保留原始关键术语与核心目标
-
-3. **清晰度提升**
-   - 替换模糊表达（如"更好""优化一下"）为具体动作动词：
-     - ✅ 使用："重构""拆分""替换""明确""限定""标准化"
-     - ❌ 禁用："改进""弄好""调整一下"
-
-4. **模型友好性**
-   - 输出为结构化 Markdown，无冗余解释
-   - 逻辑分层清晰，使用标题、列表、代码块等增强可解析性
-   - 避免修辞性描述、情感化表达或抽象建议
-
-**输出格式**
-```markdown
-# 优化后的提示词
-[在此插入优化后的完整提示词内容]
-
----
-**优化逻辑**：[一句话说明核心重构策略，聚焦表达形式的工程化升级]
-**约束**：保留原始意图与关键术语，仅重构表达形式
-```
-
-**待优化的提示词**
-{text}
-
-优化后的提示词："""
+            return _RECURSIVE_HEAD + text + _RECURSIVE_TAIL
+        return _PLAIN_HEAD + text + _PLAIN_TAIL
 
     def _mock_optimize(self, text: str, recursive: bool) -> str:
         """模拟优化结果"""
@@ -6,34 +6,59 @@
 """
 
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from ai.xiaoma_adapter import BaseAdapter
 from ai.prompt_generator import PromptGenerator
+from ai._hedge import chat_first_success
+from utils.async_lru import async_lru_cache, chat_method_key
+from utils.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
+# 对话系统提示词（每轮请求都以相同的字符串开头）
+_SYSTEM_PROMPT = """你是一个智能助手，正在与用户进行关于某段文本的对话。
+请参考用户提供的文本内容回答用户的问题。
+如果问题与文本无关，请礼貌地指出。
+回答应该准确、简洁、有帮助。"""
+
 
 class QuestionAsker:
     """基于文本的提问器，支持连续对话"""
 
-    def __init__(self, adapter: BaseAdapter, enable_cache: bool = True):
+    def __init__(self, adapter: BaseAdapter, enable_cache: bool = True,
+                 fallback_adapters: Optional[List[BaseAdapter]] = None):
         """
         初始化提问器
 
         Args:
             adapter: AI 适配器
-            enable_cache: 是否启用缓存（当前未实现）
+            enable_cache: 是否缓存相同对话的回答
+            fallback_adapters: 备用适配器列表；提供时同一请求并发发给主适配器和备用适配器，取最先成功的响应
         """
         self.adapter = adapter
+        self.fallback_adapters = list(fallback_adapters or [])
+        self.enable_cache = enable_cache
         self.prompt_generator = PromptGenerator()
         # 对话历史：包含上下文文本和多轮问答
         self.conversation_history: list = []
         self.current_context: str = ""
+        # 消息前缀（系统提示词 + 参考文本），上下文不变时每轮复用同一份，
+        # 保证各轮请求的前缀逐字节相同，便于服务端的前缀缓存命中
+        self._prefix_messages: list = [{"role": "system", "content": _SYSTEM_PROMPT}]
+        # 每次请求只带最近的若干轮对话，避免历史无限增长导致每轮发送的 token 数持续增加
+        self.max_history_turns = 8
+        self.max_history_tokens = 4000
         logger.info("提问器初始化完成（支持连续对话）")
 
     def set_context(self, text: str):
         """设置当前上下文文本"""
         self.current_context = text
+        self._prefix_messages = [{"role": "system", "content": _SYSTEM_PROMPT}]
+        if text:
+            self._prefix_messages.append({
+                "role": "system",
+                "content": f"参考文本：\n{text}\n\n请基于以上文本回答用户的问题。"
+            })
         # 清空之前的对话历史，因为上下文改变了
         self.conversation_history = []
         logger.info(f"设置上下文: {text[:50]}...")
@@ -64,7 +89,7 @@ class QuestionAsker:
             messages = self._build_conversation_messages(question)
 
             # 调用 AI
-            response = await self.adapter.chat(messages)
+            response = await self._chat(messages)
 
             # 提取回答内容
             if isinstance(response, dict):
@@ -73,10 +98,7 @@ class QuestionAsker:
                 content = str(response)
 
             # 保存到对话历史
-            self.conversation_history.append({
-                "question": question,
-                "answer": content
-            })
+            self._append_history(question, content)
 
             return content
 
@@ -112,15 +134,25 @@ class QuestionAsker:
                 yield chunk
 
             # 保存到对话历史
-            self.conversation_history.append({
-                "question": question,
-                "answer": "".join(full_answer)
-            })
+            self._append_history(question, "".join(full_answer))
 
         except Exception as e:
             logger.error(f"流式提问失败: {e}")
             yield {"error": str(e)}
 
+    @async_lru_cache(maxsize=1024, ttl=3600, key=chat_method_key)
+    async def _chat(self, messages: list) -> Dict[str, Any]:
+        """调用聊天接口（相同模型和消息在有效期内直接复用响应）"""
+        return await chat_first_success([self.adapter, *self.fallback_adapters], messages)
+
+    def _append_history(self, question: str, answer: str):
+        """追加一轮对话（同时记录 token 数，构建消息时无需重复统计）"""
+        self.conversation_history.append({
+            "question": question,
+            "answer": answer,
+            "tokens": count_tokens(question) + count_tokens(answer)
+        })
+
     def _build_conversation_messages(self, question: str) -> list:
         """
         构建包含对话历史的消息列表
@@ -131,23 +163,21 @@ class QuestionAsker:
         Returns:
             list: OpenAI 格式的消息列表
         """
-        # 系统提示词
-        system_prompt = """你是一个智能助手，正在与用户进行关于某段文本的对话。
-请参考用户提供的文本内容回答用户的问题。
-如果问题与文本无关，请礼貌地指出。
-回答应该准确、简洁、有帮助。"""
-
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-
-        # 添加上下文文本（只在第一次或上下文改变时）
-        if self.current_context:
-            context_msg = f"参考文本：\n{self.current_context}\n\n请基于以上文本回答用户的问题。"
-            messages.append({"role": "system", "content": context_msg})
-
-        # 添加对话历史
-        for item in self.conversation_history:
+        # 固定顺序：[系统提示词, 参考文本, 历史对话, 当前问题]，不变的前缀始终在最前面
+        messages = list(self._prefix_messages)
+
+        # 添加对话历史：从最近一轮往前取，最多 max_history_turns 轮，且总 token 数不超过 max_history_tokens
+        history = self.conversation_history
+        budget = self.max_history_tokens
+        kept = 0
+        # 不用 history[-n:]：n 为 0 时它会取出全部历史
+        recent = history[len(history) - min(max(self.max_history_turns, 0), len(history)):]
+        for item in reversed(recent):
+            budget -= item["tokens"]
+            if budget < 0:
+                break
+            kept += 1
+        for item in history[len(history) - kept:]:
             messages.append({"role": "user", "content": item["question"]})
             messages.append({"role": "assistant", "content": item["answer"]})
 
@@ -6,7 +6,8 @@
 
 import logging
 from typing import Dict, Any, Optional, AsyncGenerator
-from ai.xiaoma_adapter import XiaomaAdapter
+from ai.xiaoma_adapter import OpenAIAdapter
+from ai._response import extract_content
 from utils.local_cache import get_cache_manager
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 class Summarizer:
     """总结功能"""
     
-    def __init__(self, adapter: Optional[XiaomaAdapter] = None, enable_cache: bool = True):
+    def __init__(self, adapter: Optional[OpenAIAdapter] = None, enable_cache: bool = True):
         """
         初始化总结功能
         
@@ -68,7 +69,7 @@ class Summarizer:
             ]
             
             response = await self.adapter.chat(messages)
-            result = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            result = extract_content(response)
             
             # 缓存结果
             if self.enable_cache and self.cache_manager:
@@ -126,7 +127,7 @@ class Summarizer:
             ]
             
             # 调用流式API
-            full_result = ""
+            parts = []
             async for chunk in self.adapter.stream_chat(messages):
                 if "error" in chunk:
                     yield chunk
@@ -134,8 +135,9 @@ class Summarizer:
                 
                 content = chunk.get("content", "")
                 if content:
-                    full_result += content
+                    parts.append(content)
                     yield {"content": content, "delta": True}
+            full_result = "".join(parts)
             
             # 缓存完整结果
             if self.enable_cache and self.cache_manager and full_result:
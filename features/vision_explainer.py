@@ -8,7 +8,7 @@
 import logging
 import base64
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 from pathlib import Path
 import aiohttp
 import asyncio
@@ -16,6 +16,33 @@ from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# 文件头签名 -> MIME 类型（WEBP 另需检查偏移 8 处的 "WEBP"）
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def _sniff_image_mime(image: Union[str, bytes]) -> str:
+    """按文件头识别图像的 MIME 类型，无法识别时按 JPEG 处理"""
+    if isinstance(image, bytes):
+        header = image[:12]
+    else:
+        try:
+            with open(image, "rb") as image_file:
+                header = image_file.read(12)
+        except OSError:
+            header = b""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime in _IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    return "image/jpeg"
+
 
 class VisionExplainer:
     """视觉解释器类
@@ -67,33 +94,37 @@ class VisionExplainer:
         """
         return self._available
 
-    def _encode_image_to_base64(self, image_path: str) -> str:
+    def _encode_image_to_base64(self, image: Union[str, bytes]) -> str:
         """将图像编码为base64字符串
 
         Args:
-            image_path: 图像文件路径
+            image: 图像文件路径，或内存中的图像数据（如 OCRHandler.recognize_from_pil_image 编码的结果）
 
         Returns:
             str: base64编码的图像数据
         """
         try:
-            with open(image_path, "rb") as image_file:
+            if isinstance(image, bytes):
+                return base64.b64encode(image).decode('utf-8')
+            with open(image, "rb") as image_file:
                 return base64.b64encode(image_file.read()).decode('utf-8')
         except Exception as e:
             logger.error(f"图像编码失败: {e}")
             raise
 
-    def _build_vision_messages(self, image_path: str, prompt: str = None) -> list:
+    def _build_vision_messages(self, image_path: Union[str, bytes], prompt: str = None) -> list:
         """构建多模态消息
 
         Args:
-            image_path: 图像文件路径
+            image_path: 图像文件路径或图像数据
             prompt: 提示词（可选）
 
         Returns:
             list: 格式化的消息列表
         """
         base64_image = self._encode_image_to_base64(image_path)
+        # data URL 按图像的实际类型声明
+        mime = _sniff_image_mime(image_path)
 
         # 默认提示词
         if not prompt:
@@ -110,7 +141,7 @@ class VisionExplainer:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:{mime};base64,{base64_image}"
                         }
                     }
                 ]
@@ -119,13 +150,13 @@ class VisionExplainer:
 
         return messages
 
-    async def explain_image(self, image_path: str, prompt: str = None) -> Optional[str]:
+    async def explain_image(self, image_path: Union[str, bytes], prompt: str = None) -> Optional[str]:
         """解释图像内容
 
         使用多模态AI模型分析图像内容
 
         Args:
-            image_path: 图像文件路径
+            image_path: 图像文件路径，或内存中的图像数据（跳过磁盘读写）
             prompt: 特定的提示词（可选）
 
         Returns:
@@ -135,12 +166,13 @@ class VisionExplainer:
             logger.warning("视觉解释器不可用")
             return None
 
-        if not os.path.exists(image_path):
+        in_memory = isinstance(image_path, bytes)
+        if not in_memory and not os.path.exists(image_path):
             logger.error(f"图像文件不存在: {image_path}")
             return None
 
         try:
-            logger.info(f"分析图像: {image_path}")
+            logger.info(f"分析图像: {'<内存图像>' if in_memory else image_path}")
 
             # 构建消息
             messages = self._build_vision_messages(image_path, prompt)
@@ -160,13 +192,13 @@ class VisionExplainer:
             logger.error(f"图像分析失败: {e}", exc_info=True)
             return None
 
-    async def recognize_text(self, image_path: str, language: str = "auto") -> Optional[str]:
+    async def recognize_text(self, image_path: Union[str, bytes], language: str = "auto") -> Optional[str]:
         """从图像中识别文字
 
         使用视觉模型进行OCR识别
 
         Args:
-            image_path: 图像文件路径
+            image_path: 图像文件路径或图像数据
             language: 识别语言（auto/中文/英文等）
 
         Returns:
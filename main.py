@@ -28,7 +28,7 @@ from ui.tray_icon import TrayIcon
 from ui.popup_window import PopupWindow
 from ui.settings_dialog import SettingsDialog
 from utils.theme_manager import get_theme_manager, ThemeType
-from ai.xiaoma_adapter import XiaomaAdapter
+from ai.xiaoma_adapter import OpenAIAdapter
 from ai.ollama_adapter import OllamaAdapter
 from features.translator import Translator
 from features.explainer import Explainer
@@ -39,6 +39,7 @@ from features.prompt_optimizer import PromptOptimizer
 from features.question_asker import QuestionAsker
 from utils.logger import setup_logger
 from utils.config_loader import get_config
+from utils.event_loop_manager import install_uvloop, run_qt_app
 from ai.iflow_adapter import iFlowAdapter
 
 
@@ -63,6 +64,9 @@ def show_admin_warning():
 
 def main():
     """主入口"""
+    # 尽早安装 uvloop（若可用），之后创建的所有事件循环都会使用它
+    install_uvloop()
+
     # 先创建 QApplication
     app = QApplication(sys.argv)
 
@@ -139,7 +143,7 @@ class WordSelectionAssistant(QObject):
             self.ai_adapter = iFlowAdapter(model=iflow_model)
             logger.info(f"使用iFlow适配器，模型: {iflow_model}")
         else:  # 默认使用OpenAI兼容API
-            self.ai_adapter = XiaomaAdapter()  # 保留向后兼容性
+            self.ai_adapter = OpenAIAdapter()
             # 设置默认模型
             openai_model = self.config.get('ai', {}).get('openai', {}).get('model', 'gpt-3.5-turbo')
             self.ai_adapter.set_model(openai_model)
@@ -165,7 +169,9 @@ class WordSelectionAssistant(QObject):
             self.chart_generator = None
 
         # 核心组件
-        self.hotkey_manager = HotkeyManager()
+        self.hotkey_manager = HotkeyManager(
+            debounce=self.config.get('hotkey', {}).get('debounce', 0.15)
+        )
         self.text_capture = TextCapture()
         self.function_router = FunctionRouter()
 
@@ -246,6 +252,7 @@ class WordSelectionAssistant(QObject):
 
         # 功能选择
         self.function_router.result_ready.connect(self._on_result)
+        self.function_router.error_occurred.connect(self._on_error)
 
     def _on_hotkey(self, data):
         """热键触发"""
@@ -281,6 +288,11 @@ class WordSelectionAssistant(QObject):
         logger.info(f"功能 {feature_type} 处理完成")
         self.popup_window._update_result(result)
 
+    def _on_error(self, feature_type: str, error_msg: str):
+        """处理功能执行失败"""
+        logger.warning(f"功能 {feature_type} 执行失败: {error_msg}")
+        self.popup_window._update_result(f"错误: {error_msg}")
+
     def _show_settings(self):
         """显示设置对话框"""
         dialog = SettingsDialog()
@@ -308,8 +320,8 @@ class WordSelectionAssistant(QObject):
 
             logger.info(f"划词助手启动运行，热键: {hotkey_text}")
 
-            # 主循环
-            sys.exit(self.app.exec())
+            # 主循环（安装了 qasync 时运行在与 Qt 集成的 asyncio 事件循环上），以 Qt 的退出码退出
+            sys.exit(run_qt_app(self.app))
         except Exception as e:
             logger.error(f"程序运行时发生未捕获的异常: {e}", exc_info=True)
             import traceback
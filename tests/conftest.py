@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest 配置和共享 fixture
+"""
+
+import time
+
+import pytest
+
+
+class FakeClock:
+    """可手动推进的 time.monotonic 替身"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class _PatchedTime:
+    """只替换 monotonic 的 time 模块代理，其余属性仍取自真实的 time 模块"""
+
+    def __init__(self, clock: FakeClock):
+        self.monotonic = clock
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """
+    为指定模块安装可手动推进的时钟
+
+    只替换该模块引用的 time，不影响事件循环等其他代码使用的 time.monotonic。
+    用法：clock = fake_clock(module); clock.advance(10)
+    """
+    def install(module) -> FakeClock:
+        clock = FakeClock()
+        monkeypatch.setattr(module, "time", _PatchedTime(clock))
+        return clock
+
+    return install
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ai._hedge 对冲请求测试"""
+
+import asyncio
+
+import pytest
+
+from ai._hedge import chat_first_success
+
+
+class _Adapter:
+    """延迟 delay 秒后返回 result，result 为异常时抛出；记录是否被取消"""
+
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = False
+
+    async def chat(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+
+_OK = {"choices": [{"message": {"content": "ok"}}]}
+_MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class TestChatFirstSuccess:
+    @pytest.mark.asyncio
+    async def test_single_adapter_called_directly(self):
+        adapter = _Adapter({"error": "down"})
+        assert await chat_first_success([adapter], _MESSAGES) == {"error": "down"}
+        assert adapter.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_error_dict_then_slow_success(self):
+        fast = _Adapter({"error": "down"}, delay=0.0)
+        slow = _Adapter(_OK, delay=0.02)
+        assert await chat_first_success([fast, slow], _MESSAGES) is _OK
+
+    @pytest.mark.asyncio
+    async def test_all_error_dicts_returns_last_error(self):
+        first = _Adapter({"error": "first"}, delay=0.0)
+        second = _Adapter({"error": "second"}, delay=0.01)
+        assert await chat_first_success([first, second], _MESSAGES) == {"error": "second"}
+
+    @pytest.mark.asyncio
+    async def test_exception_and_error_dict_returns_error_dict(self):
+        raising = _Adapter(RuntimeError("boom"), delay=0.0)
+        erroring = _Adapter({"error": "down"}, delay=0.01)
+        assert await chat_first_success([raising, erroring], _MESSAGES) == {"error": "down"}
+
+    @pytest.mark.asyncio
+    async def test_all_raise_reraises_last_exception(self):
+        first = _Adapter(RuntimeError("first"), delay=0.0)
+        second = _Adapter(ValueError("second"), delay=0.01)
+        with pytest.raises(ValueError, match="second"):
+            await chat_first_success([first, second], _MESSAGES)
+
+    @pytest.mark.asyncio
+    async def test_losing_tasks_are_cancelled(self):
+        fast = _Adapter(_OK, delay=0.0)
+        slow = _Adapter(_OK, delay=1.0)
+        assert await chat_first_success([fast, slow], _MESSAGES) is _OK
+        await asyncio.sleep(0)
+        assert slow.cancelled
+        assert not fast.cancelled
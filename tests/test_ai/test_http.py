@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ai._http 熔断器与按事件循环缓存的客户端测试"""
+
+import asyncio
+
+import pytest
+
+from ai import _http
+from ai._http import CircuitBreaker, CircuitOpenError, LoopBoundClients
+
+
+class TestCircuitBreaker:
+    @pytest.fixture(autouse=True)
+    def _clock(self, fake_clock):
+        self.clock = fake_clock(_http)
+
+    def _opened_breaker(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, cool_down=10)
+        breaker.record_failure()
+        breaker.record_failure()
+        return breaker
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, cool_down=10)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, cool_down=10)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_admits_single_trial(self):
+        breaker = self._opened_breaker()
+        self.clock.advance(10)
+        breaker.check()
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_trial_success_closes(self):
+        breaker = self._opened_breaker()
+        self.clock.advance(10)
+        breaker.check()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        breaker.check()
+
+    def test_trial_failure_reopens(self):
+        breaker = self._opened_breaker()
+        self.clock.advance(10)
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        self.clock.advance(5)
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+        self.clock.advance(5)
+        breaker.check()
+        assert breaker.state == "half_open"
+
+    def test_unfinished_trial_is_replaced_after_cool_down(self):
+        breaker = self._opened_breaker()
+        self.clock.advance(10)
+        breaker.check()
+        self.clock.advance(10)
+        breaker.check()
+        assert breaker.state == "half_open"
+
+
+class TestLoopBoundClients:
+    def test_reuses_client_within_loop(self):
+        clients = LoopBoundClients(object)
+
+        async def get_twice():
+            return clients.get(), clients.get()
+
+        first, second = asyncio.run(get_twice())
+        assert first is second
+
+    def test_new_loop_gets_new_client_and_drops_closed_loops(self):
+        clients = LoopBoundClients(object)
+
+        async def get():
+            return clients.get()
+
+        first = asyncio.run(get())
+        second = asyncio.run(get())
+        assert second is not first
+        assert len(clients._clients) == 1
+
+    def test_pop(self):
+        clients = LoopBoundClients(object)
+
+        async def get_and_pop():
+            client = clients.get()
+            return client, clients.pop(), clients.pop()
+
+        client, popped, missing = asyncio.run(get_and_pop())
+        assert popped is client
+        assert missing is None
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ai.openai_compatible SSE 行解析测试（未安装 aiohttp 时跳过）"""
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from ai.openai_compatible import _parse_sse_line  # noqa: E402
+
+
+class TestParseSseLine:
+    def test_data_line(self):
+        assert _parse_sse_line(b'data: {"a": 1}\r') == {"a": 1}
+
+    def test_utf8_payload(self):
+        assert _parse_sse_line('data: {"text": "你好"}'.encode("utf-8")) == {"text": "你好"}
+
+    def test_done_marker(self):
+        assert _parse_sse_line(b"data: [DONE]") is None
+
+    def test_non_data_line(self):
+        assert _parse_sse_line(b": keep-alive") is None
+        assert _parse_sse_line(b"") is None
+
+    def test_invalid_json(self):
+        assert _parse_sse_line(b"data: {broken") is None
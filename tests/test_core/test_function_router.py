@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""core.function_router 分发表测试（未安装 PyQt6 时跳过）"""
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from core.function_router import FunctionType, _DispatchTable  # noqa: E402
+
+
+class TestDispatchTable:
+    def test_lookup_by_plain_string(self):
+        table = _DispatchTable({FunctionType.CHART: ("chart", True)})
+        assert table["chart"] == ("chart", True)
+
+    def test_unknown_function_returns_sync_fallback(self):
+        table = _DispatchTable()
+        execute, is_async = table["missing"]
+        assert is_async is False
+        assert execute("text", {}) == "未知功能: missing"
+        assert "missing" not in table
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""features.custom_builder 内置功能模板测试"""
+
+from features.custom_builder import CustomBuilder
+
+
+class _FixedPromptGenerator:
+    """总是返回固定提示词的 PromptGenerator 替身"""
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+
+    def get_prompt(self, feature_type, text, options=None):
+        return self.prompt
+
+
+def _explainer_template(builder: CustomBuilder) -> str:
+    return builder.custom_functions["python_explainer"].prompt_template
+
+
+def test_template_comes_from_injected_generator():
+    first = CustomBuilder(prompt_generator=_FixedPromptGenerator("first {{text}}"))
+    second = CustomBuilder(prompt_generator=_FixedPromptGenerator("second {{text}}"))
+
+    assert _explainer_template(first) == "first {{text}}"
+    assert _explainer_template(second) == "second {{text}}"
+
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""features.ocr_handler 同步识别接口测试"""
+
+import asyncio
+
+import pytest
+
+from features.ocr_handler import OCRHandler
+from utils.event_loop_manager import EventLoopManager
+
+
+class _FakeImage:
+    """只实现 save() 的图像替身"""
+
+    def save(self, buf, format=None):
+        buf.write(b"\x89PNG\r\n\x1a\n")
+
+
+class TestRecognizeFromPilImage:
+    def setup_method(self):
+        self.handler = OCRHandler()
+
+    def test_returns_result_from_background_loop(self, monkeypatch):
+        async def recognize(image_data, language, use_ai):
+            return "文字"
+
+        monkeypatch.setattr(self.handler, "recognize_from_bytes", recognize)
+        assert self.handler.recognize_from_pil_image(_FakeImage(), image_format="PNG") == "文字"
+
+    def test_timeout_returns_none(self, monkeypatch):
+        async def recognize(image_data, language, use_ai):
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(self.handler, "recognize_from_bytes", recognize)
+        assert self.handler.recognize_from_pil_image(_FakeImage(), image_format="PNG", timeout=0.05) is None
+
+    def test_rejects_call_from_background_loop(self):
+        async def call_sync():
+            return self.handler.recognize_from_pil_image(_FakeImage(), image_format="PNG")
+
+        future = EventLoopManager.submit(call_sync())
+        with pytest.raises(RuntimeError, match="recognize_from_bytes"):
+            future.result(timeout=5)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""features.question_asker 对话历史裁剪测试"""
+
+from features.question_asker import QuestionAsker
+
+
+class TestBuildConversationMessages:
+    def setup_method(self):
+        self.asker = QuestionAsker(adapter=None, enable_cache=False)
+        for i in range(5):
+            self.asker.conversation_history.append(
+                {"question": f"q{i}", "answer": f"a{i}", "tokens": 100}
+            )
+
+    def _history_questions(self, messages):
+        # 去掉系统提示词和当前问题，只看历史中的提问
+        return [m["content"] for m in messages[1:-1] if m["role"] == "user"]
+
+    def test_keeps_most_recent_turns(self):
+        self.asker.max_history_turns = 2
+        messages = self.asker._build_conversation_messages("now")
+        assert self._history_questions(messages) == ["q3", "q4"]
+        assert messages[-1] == {"role": "user", "content": "now"}
+
+    def test_token_budget(self):
+        self.asker.max_history_turns = 8
+        self.asker.max_history_tokens = 250
+        messages = self.asker._build_conversation_messages("now")
+        assert self._history_questions(messages) == ["q3", "q4"]
+
+    def test_zero_turns_disables_history(self):
+        self.asker.max_history_turns = 0
+        messages = self.asker._build_conversation_messages("now")
+        assert self._history_questions(messages) == []
+        assert len(messages) == 2
+
+    def test_prefix_comes_first(self):
+        self.asker.set_context("参考")
+        self.asker.conversation_history.append({"question": "q", "answer": "a", "tokens": 1})
+        messages = self.asker._build_conversation_messages("now")
+        assert messages[:2] == self.asker._prefix_messages
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""utils.async_lru 协程缓存测试"""
+
+import asyncio
+
+import pytest
+
+from utils import async_lru
+from utils.async_lru import async_lru_cache, chat_cache_key, chat_method_key
+
+
+def _counting(result=None, delay=0.0):
+    """返回被缓存的协程函数及其调用记录"""
+    calls = []
+
+    async def func(x):
+        calls.append(x)
+        if delay:
+            await asyncio.sleep(delay)
+        return result if result is not None else x * 2
+
+    return func, calls
+
+
+class TestAsyncLruCache:
+    @pytest.mark.asyncio
+    async def test_caches_result(self):
+        func, calls = _counting()
+        cached = async_lru_cache()(func)
+        assert await cached(1) == 2
+        assert await cached(1) == 2
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self, fake_clock):
+        clock = fake_clock(async_lru)
+        func, calls = _counting()
+        cached = async_lru_cache(ttl=10)(func)
+        await cached(1)
+        clock.advance(9)
+        await cached(1)
+        assert calls == [1]
+        clock.advance(2)
+        await cached(1)
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        func, calls = _counting()
+        cached = async_lru_cache(maxsize=2)(func)
+        await cached(1)
+        await cached(2)
+        await cached(1)  # 1 成为最近使用
+        await cached(3)  # 淘汰 2
+        await cached(1)
+        await cached(2)
+        assert calls == [1, 2, 3, 2]
+
+    @pytest.mark.asyncio
+    async def test_exception_not_cached(self):
+        calls = []
+
+        @async_lru_cache()
+        async def func(x):
+            calls.append(x)
+            raise ValueError("boom")
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await func(1)
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_error_dict_not_cached(self):
+        func, calls = _counting(result={"error": "timeout"})
+        cached = async_lru_cache()(func)
+        assert await cached(1) == {"error": "timeout"}
+        await cached(1)
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_custom_should_cache(self):
+        func, calls = _counting(result={"error": "timeout"})
+        cached = async_lru_cache(should_cache=lambda result: True)(func)
+        await cached(1)
+        await cached(1)
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_none_key_bypasses_cache(self):
+        func, calls = _counting()
+        cached = async_lru_cache(key=lambda x: None)(func)
+        await cached(1)
+        await cached(1)
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_cache_clear(self):
+        func, calls = _counting()
+        cached = async_lru_cache()(func)
+        await cached(1)
+        cached.cache_clear()
+        await cached(1)
+        assert calls == [1, 1]
+
+
+class TestChatMethodKey:
+    def test_respects_enable_cache(self):
+        class _Feature:
+            adapter = type("Adapter", (), {"model": "m"})()
+            enable_cache = True
+
+        feature = _Feature()
+        messages = [{"role": "user", "content": "hi"}]
+        assert chat_method_key(feature, messages) == chat_cache_key("m", messages)
+        feature.enable_cache = False
+        assert chat_method_key(feature, messages) is None
+
+
+class TestChatCacheKey:
+    def test_ignores_dict_key_order(self):
+        a = [{"role": "user", "content": "hi"}]
+        b = [{"content": "hi", "role": "user"}]
+        assert chat_cache_key("m", a) == chat_cache_key("m", b)
+
+    def test_includes_model(self):
+        messages = [{"role": "user", "content": "hi"}]
+        assert chat_cache_key("m", messages) != chat_cache_key("other", messages)
+
+    def test_fallback_without_orjson_and_xxhash(self, monkeypatch):
+        messages = [{"role": "user", "content": "你好"}]
+        monkeypatch.setattr(async_lru, "orjson", None)
+        monkeypatch.setattr(async_lru, "xxhash", None)
+        key = chat_cache_key("m", messages)
+        assert key.startswith("m:")
+        assert key == chat_cache_key("m", [{"content": "你好", "role": "user"}])
+
+
+class TestInflightCoalescing:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_call(self):
+        func, calls = _counting(delay=0.01)
+        cached = async_lru_cache()(func)
+        results = await asyncio.gather(*(cached(1) for _ in range(5)))
+        assert results == [2] * 5
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        func, calls = _counting(delay=0.02)
+        cached = async_lru_cache()(func)
+        first = asyncio.ensure_future(cached(1))
+        second = asyncio.ensure_future(cached(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 2
+        assert first.cancelled()
+        assert calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_failure_is_shared_and_not_cached(self):
+        calls = []
+
+        @async_lru_cache()
+        async def func(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(func(1), func(1), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert calls == [1]
+        with pytest.raises(ValueError):
+            await func(1)
+        assert calls == [1, 1]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""utils.chart_code_executor 图表代码执行测试（工作进程中执行，用不依赖 matplotlib 的代码代替绘图）"""
+
+import time
+
+from utils.chart_code_executor import ChartCodeExecutor
+
+# validate_code 要求代码提到 matplotlib 和 savefig；这里以注释满足，实际不导入
+_HANG_CODE = "# matplotlib plt.savefig\nwhile True:\n    pass\n"
+_WRITE_CODE = (
+    "# matplotlib plt.savefig\n"
+    "from pathlib import Path\n"
+    "Path(output_path).write_bytes(b'png')\n"
+)
+
+
+def test_writes_image_in_worker(tmp_path):
+    executor = ChartCodeExecutor(tmp_path, timeout=10)
+
+    result = executor.execute(_WRITE_CODE)
+
+    assert result["success"] is True
+    assert (tmp_path / result["image_path"]).read_bytes() == b"png"
+
+
+def test_reports_child_errors(tmp_path):
+    executor = ChartCodeExecutor(tmp_path, timeout=10)
+
+    result = executor.execute("# matplotlib plt.savefig\nraise ValueError('boom')\n")
+
+    assert "ValueError: boom" in result["error"]
+
+
+def test_timed_out_execution_does_not_block_next(tmp_path):
+    executor = ChartCodeExecutor(tmp_path, timeout=1)
+
+    started = time.monotonic()
+    assert executor.execute_with_timeout(_HANG_CODE) == {"error": "执行超时（1秒）"}
+    assert time.monotonic() - started < 5
+
+    # 卡住的执行已随工作进程终止，下一次执行在重建的工作进程中拿到完整的超时预算
+    result = executor.execute_with_timeout(_WRITE_CODE)
+    assert result["success"] is True
+
+
+def test_reuses_worker_process(tmp_path):
+    executor = ChartCodeExecutor(tmp_path, timeout=10)
+    pid_code = "# matplotlib plt.savefig\nfrom os import getpid\nprint(getpid())\n"
+
+    first = executor.execute(pid_code)
+    second = executor.execute(pid_code)
+
+    assert first["stdout"].strip()
+    assert first["stdout"] == second["stdout"]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""utils.semantic_cache 语义缓存测试（未安装 hnswlib 时跳过；编码模型用固定向量代替）"""
+
+import pytest
+
+pytest.importorskip("hnswlib")
+np = pytest.importorskip("numpy")
+
+from utils import semantic_cache  # noqa: E402
+from utils import config_loader  # noqa: E402
+from utils.semantic_cache import EMBEDDING_DIM, SemanticCache, get_semantic_cache  # noqa: E402
+
+
+def _unit(*components):
+    """前几维为给定值、其余为 0 的归一化向量"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    vector[:len(components)] = components
+    return vector / np.linalg.norm(vector)
+
+
+# 文本 -> 向量：同义改写与原文几乎重合，无关文本正交
+_VECTORS = {
+    "什么是梯度下降": _unit(1, 0),
+    "梯度下降是什么": _unit(1, 0.05),
+    "什么是傅里叶变换": _unit(0, 1),
+}
+
+
+class _FakeEncoder:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def encode(self, texts, normalize_embeddings=True):
+        return np.stack([_VECTORS[t] if t in _VECTORS else _one_hot(t) for t in texts])
+
+
+def _one_hot(text):
+    """item<i> -> 第 10+i 维为 1 的向量，彼此正交"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    vector[10 + int(text[len("item"):])] = 1.0
+    return vector
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_cache, "SentenceTransformer", _FakeEncoder)
+    return SemanticCache(cache_dir=str(tmp_path), max_elements=4)
+
+
+class TestSemanticCache:
+    def test_similar_text_hits(self, cache):
+        cache.add("什么是梯度下降", "答案A", "explain:m")
+        assert cache.lookup("梯度下降是什么", "explain:m") == "答案A"
+
+    def test_unrelated_text_misses(self, cache):
+        cache.add("什么是梯度下降", "答案A", "explain:m")
+        assert cache.lookup("什么是傅里叶变换", "explain:m") is None
+
+    def test_namespaces_are_separate(self, cache):
+        cache.add("什么是梯度下降", "答案A", "explain:model-a")
+        assert cache.lookup("什么是梯度下降", "explain:model-b") is None
+
+    def test_persists_across_instances(self, cache, tmp_path):
+        cache.add("什么是梯度下降", "答案A", "explain:m")
+        cache.save()
+        reloaded = SemanticCache(cache_dir=str(tmp_path), max_elements=4)
+        assert reloaded.lookup("梯度下降是什么", "explain:m") == "答案A"
+
+    def test_disabled_by_flag(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(semantic_cache, "SentenceTransformer", _FakeEncoder)
+        disabled = SemanticCache(cache_dir=str(tmp_path), enabled=False)
+        disabled.add("什么是梯度下降", "答案A", "explain:m")
+        assert disabled.lookup("什么是梯度下降", "explain:m") is None
+
+    def test_full_namespace_overwrites_oldest(self, cache):
+        for i in range(6):
+            cache.add(f"item{i}", f"结果{i}", "explain:m")
+        assert cache.lookup("item0", "explain:m") is None
+        assert cache.lookup("item1", "explain:m") is None
+        assert [cache.lookup(f"item{i}", "explain:m") for i in range(2, 6)] == [
+            "结果2", "结果3", "结果4", "结果5"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_async_lookup_and_add(self, cache):
+        await cache.add_async("什么是梯度下降", "答案A", "explain:m")
+        await cache.add_async("什么是傅里叶变换", "", "explain:m")
+        assert await cache.lookup_async("梯度下降是什么", "explain:m") == "答案A"
+        assert await cache.lookup_async("什么是傅里叶变换", "explain:m") is None
+
+    def test_namespace_includes_model(self):
+        class _Adapter:
+            model = "model-a"
+        assert SemanticCache.namespace_for("explain", _Adapter(), "medium", "general") == \
+            "explain:model-a:medium:general"
+        assert SemanticCache.namespace_for("optimize", None, False) == "optimize:None:False"
+
+
+def test_off_unless_enabled_in_config(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "SentenceTransformer", _FakeEncoder)
+    monkeypatch.setattr(semantic_cache, "_semantic_cache", None)
+    monkeypatch.setattr(config_loader, "_config_instance", config_loader.ConfigLoader())
+    assert get_semantic_cache().enabled is False
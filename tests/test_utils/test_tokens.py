@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""utils.tokens 未安装 tiktoken 时的 token 估算测试"""
+
+import pytest
+
+from utils import tokens
+from utils.tokens import count_tokens
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken(monkeypatch):
+    monkeypatch.setattr(tokens, "_encoding", False)
+
+
+def test_latin_text_four_chars_per_token():
+    assert count_tokens("a" * 40) == 10
+
+
+def test_cjk_text_one_char_per_token():
+    assert count_tokens("什么是梯度下降") == 7
+    assert count_tokens("梯度下降，gradient") == 5 + 8 // 4
+
+
+def test_short_text_counts_at_least_one():
+    assert count_tokens("hi") == 1
+    assert count_tokens("") == 0
@@ -577,8 +577,6 @@ class PopupWindow(QWidget):
 
                 def execute_feature():
                     """在线程中执行功能"""
-                    import asyncio
-
                     async def async_task():
                         if feature_type == "translate":
                             if self.translator:
@@ -610,8 +608,8 @@ class PopupWindow(QWidget):
                         else:
                             return f"未知功能: {feature_type}"
 
-                    # 使用 asyncio.run() 执行
-                    return asyncio.run(async_task())
+                    # 在常驻的后台事件循环中执行，复用适配器的客户端和连接池
+                    return EventLoopManager.submit(async_task()).result()
 
                 # 提交到线程池（不阻塞主线程）
                 future = thread_manager.submit(execute_feature)
@@ -1,16 +1,47 @@
 # Utils模块初始化
-from .logger import setup_logger, get_logger
-from .config_loader import ConfigLoader, get_config
-from .theme_manager import ThemeManager, ThemeType, get_theme_manager
-from .local_cache import get_cache_manager
-from .chart_dependency_manager import ChartDependencyManager, check_chart_dependencies, ensure_chart_dependencies
-from .chart_code_executor import ChartCodeExecutor, execute_chart_code
+# 子模块按需导入（PEP 562）：theme_manager 依赖 PyQt6，
+# 不应让 utils.local_cache、utils.event_loop_manager 等无界面模块的使用者也加载 Qt
+import importlib
+
+# 导出名称 -> 所在子模块
+_LAZY_IMPORTS = {
+    'setup_logger': '.logger',
+    'get_logger': '.logger',
+    'ConfigLoader': '.config_loader',
+    'get_config': '.config_loader',
+    'ThemeManager': '.theme_manager',
+    'ThemeType': '.theme_manager',
+    'get_theme_manager': '.theme_manager',
+    'get_cache_manager': '.local_cache',
+    'SemanticCache': '.semantic_cache',
+    'get_semantic_cache': '.semantic_cache',
+    'ChartDependencyManager': '.chart_dependency_manager',
+    'check_chart_dependencies': '.chart_dependency_manager',
+    'ensure_chart_dependencies': '.chart_dependency_manager',
+    'ChartCodeExecutor': '.chart_code_executor',
+    'execute_chart_code': '.chart_code_executor',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     'setup_logger', 'get_logger', 
     'ConfigLoader', 'get_config', 
     'ThemeManager', 'ThemeType', 'get_theme_manager', 
     'get_cache_manager',
+    'SemanticCache', 'get_semantic_cache',
     'ChartDependencyManager', 'check_chart_dependencies', 'ensure_chart_dependencies',
     'ChartCodeExecutor', 'execute_chart_code'
 ]
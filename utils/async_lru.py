@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+协程结果缓存
+LRU + TTL 淘汰；只缓存协程的返回值，不缓存 Task（失败或被取消的调用不会留在缓存里）。
+适配器以 {"error": ...} 字典返回的失败结果同样不缓存。
+相同键的并发调用合并为一次：后到的调用等待进行中的那次，而不是各自发起请求。
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Dict, Optional
+
+# 缓存键计算：优先使用 orjson 序列化、xxh3 哈希（键只在进程内使用，无需加密哈希），
+# 未安装时使用标准库 json 和 blake2b
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def chat_cache_key(model: Optional[str], messages: List[Dict[str, Any]]) -> str:
+    """由模型名和消息列表生成缓存键"""
+    if orjson is not None:
+        payload = orjson.dumps(messages, option=orjson.OPT_SORT_KEYS)
+    else:
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    if xxhash is not None:
+        digest = xxhash.xxh3_128_hexdigest(payload)
+    else:
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    return f"{model}:{digest}"
+
+
+def chat_method_key(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    功能类 _chat(self, messages) 方法的缓存键
+
+    实例的 enable_cache 为 False 时返回 None，直接调用而不缓存
+    """
+    if not getattr(self, "enable_cache", True):
+        return None
+    return chat_cache_key(getattr(self.adapter, "model", None), messages)
+
+
+def is_cacheable_result(result: Any) -> bool:
+    """默认的结果过滤：适配器返回的错误字典不缓存"""
+    return not (isinstance(result, dict) and "error" in result)
+
+
+def async_lru_cache(maxsize: int = 1024, ttl: float = 3600.0,
+                    key: Optional[Callable[..., Optional[Hashable]]] = None,
+                    should_cache: Callable[[Any], bool] = is_cacheable_result):
+    """
+    协程 LRU + TTL 缓存装饰器
+
+    Args:
+        maxsize: 最大条目数，超出时淘汰最久未使用的条目
+        ttl: 条目有效期（秒）
+        key: 由调用参数生成缓存键的函数，返回 None 表示本次不缓存；
+             默认使用位置参数和关键字参数（要求可哈希）
+        should_cache: 判断返回值是否写入缓存；默认跳过含 "error" 键的字典
+    """
+    def decorator(func):
+        cache: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # 缓存由所有事件循环共用（后台循环与 Qt 主循环运行在不同线程），读写需加锁
+        cache_lock = threading.Lock()
+        # 进行中的调用：(事件循环, 键) -> Task，完成后立即移除
+        inflight: Dict[tuple, asyncio.Task] = {}
+
+        def _on_done(task: asyncio.Task, k: Hashable, inflight_key: tuple):
+            inflight.pop(inflight_key, None)
+            # 只缓存成功的结果；exception() 同时标记异常已被取出，避免未取出异常的警告
+            if task.cancelled() or task.exception() is not None:
+                return
+            result = task.result()
+            if not should_cache(result):
+                return
+            with cache_lock:
+                cache[k] = (time.monotonic() + ttl, result)
+                cache.move_to_end(k)
+                if len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            if k is None:
+                return await func(*args, **kwargs)
+
+            with cache_lock:
+                entry = cache.get(k)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        cache.move_to_end(k)
+                        return entry[1]
+                    del cache[k]
+
+            # Task 绑定事件循环，不同循环的调用不合并
+            inflight_key = (asyncio.get_running_loop(), k)
+            task = inflight.get(inflight_key)
+            if task is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                inflight[inflight_key] = task
+                task.add_done_callback(functools.partial(_on_done, k=k, inflight_key=inflight_key))
+            # shield：某个等待者被取消时不取消共享的调用，其他等待者仍能拿到结果
+            return await asyncio.shield(task)
+
+        def cache_clear():
+            with cache_lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -5,13 +5,17 @@
 安全地执行 LLM 生成的绑图代码
 """
 
-import logging
-import sys
 import io
+import logging
+import os
+import signal
+import threading
 import traceback
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout, redirect_stderr
 from pathlib import Path
 from typing import Dict, Optional, Tuple, List
-from contextlib import redirect_stdout, redirect_stderr
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +66,49 @@ FORBIDDEN_PATTERNS = [
 ]
 
 
+def _init_worker():
+    """工作进程初始化：固定 Agg 后端（无显示器环境）并预先导入 pyplot 和 numpy"""
+    os.environ['MPLBACKEND'] = 'Agg'
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot  # noqa: F401
+        import numpy  # noqa: F401
+    except Exception as e:
+        logger.debug(f"预加载 matplotlib 失败: {e}")
+
+
+def _run_chart_code(full_code: str) -> Dict:
+    """在工作进程中执行代码，返回捕获的输出（工作进程一次只执行一段代码）"""
+    stdout_capture = io.StringIO()
+    stderr_capture = io.StringIO()
+    result: Dict = {}
+    
+    try:
+        import matplotlib.pyplot as plt
+        figs_before = set(plt.get_fignums())
+    except ImportError:
+        plt = None
+    
+    try:
+        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+            exec(full_code, {})
+    except SyntaxError as e:
+        result["error"] = f"语法错误: {e}"
+    except Exception as e:
+        result["error"] = f"执行错误: {str(e)}\n{traceback.format_exc()}"
+    finally:
+        # 工作进程长期存在，pyplot 会一直持有创建的图形；
+        # 关闭本次新建的图形，避免多次生成后内存持续增长
+        if plt is not None:
+            for num in set(plt.get_fignums()) - figs_before:
+                plt.close(num)
+    
+    result["stdout"] = stdout_capture.getvalue()
+    result["stderr"] = stderr_capture.getvalue()
+    return result
+
+
 class ChartCodeExecutor:
     """图表代码执行器
     
@@ -81,21 +128,43 @@ class ChartCodeExecutor:
         self.output_dir.mkdir(exist_ok=True)
         self.timeout = timeout
         
-        # matplotlib 无显示器后端
-        self._setup_matplotlib_backend()
+        # 代码在单个常驻工作进程中执行：pyplot 只在进程启动时导入一次，
+        # 卡住的代码超时后可直接终止该进程，下次执行时重建
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._worker_pid: Optional[int] = None
+        # 工作进程一次只执行一段代码；持有者最多等待 timeout 秒，超时即终止工作进程并释放
+        self._exec_lock = threading.Lock()
+        # 在后台线程中启动工作进程，首次生成图表时不再承担数百毫秒的冷导入
+        threading.Thread(target=self._warmup_worker, name="chart-worker-warmup", daemon=True).start()
     
-    def _setup_matplotlib_backend(self):
-        """配置 matplotlib 后端"""
-        import os
-        # 强制使用 Agg 后端（无显示器环境）
-        os.environ.setdefault('MPLBACKEND', 'Agg')
-        
+    def _warmup_worker(self):
+        """预先启动工作进程"""
         try:
-            import matplotlib
-            if matplotlib.get_backend().lower() != 'agg':
-                matplotlib.use('Agg')
+            with self._exec_lock:
+                self._get_pool()
         except Exception as e:
-            logger.warning(f"配置 matplotlib 后端失败: {e}")
+            logger.debug(f"启动图表工作进程失败: {e}")
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """获取工作进程池（调用方需持有 _exec_lock），不存在时创建并等待工作进程就绪"""
+        if self._pool is None:
+            pool = ProcessPoolExecutor(max_workers=1, initializer=_init_worker)
+            # 记录工作进程 pid，超时后据此终止进程
+            self._worker_pid = pool.submit(os.getpid).result()
+            self._pool = pool
+        return self._pool
+    
+    def _discard_pool(self):
+        """终止工作进程并丢弃进程池（调用方需持有 _exec_lock）"""
+        pool, pid = self._pool, self._worker_pid
+        self._pool = self._worker_pid = None
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        if pool is not None:
+            pool.shutdown(wait=False)
     
     def validate_code(self, code: str) -> Dict:
         """
@@ -148,11 +217,6 @@ class ChartCodeExecutor:
         if not validation["safe"]:
             return {"error": validation["reason"]}
         
-        # 准备执行环境
-        local_vars = {}
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
-        
         # 生成输出文件路径
         import uuid
         output_filename = f"chart_{uuid.uuid4().hex[:8]}.png"
@@ -176,18 +240,25 @@ output_path = OUTPUT_PATH
             
             full_code = setup_code + code
             
-            # 设置 matplotlib 后端
-            import matplotlib
-            matplotlib.use('Agg')
-            
-            # 执行代码 - 不做路径替换，直接执行
-            # setup_code 中定义的 output_path 是全局变量
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                exec(full_code, {}, local_vars)
+            with self._exec_lock:
+                try:
+                    future = self._get_pool().submit(_run_chart_code, full_code)
+                    run_result = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    # 进程内的执行无法中途取消，终止工作进程，下次执行时重建
+                    self._discard_pool()
+                    return {"error": f"执行超时（{self.timeout}秒）"}
+                except BrokenProcessPool:
+                    self._discard_pool()
+                    return {"error": "执行错误: 图表工作进程异常退出"}
             
             # 检查输出
-            stdout_output = stdout_capture.getvalue()
-            stderr_output = stderr_capture.getvalue()
+            stdout_output = run_result["stdout"]
+            stderr_output = run_result["stderr"]
+            
+            if "error" in run_result:
+                logger.error(run_result["error"])
+                return run_result
             
             if stderr_output:
                 logger.warning(f"代码执行警告: {stderr_output}")
@@ -219,11 +290,6 @@ output_path = OUTPUT_PATH
                 "stderr": stderr_output
             }
             
-        except SyntaxError as e:
-            error_msg = f"语法错误: {e}"
-            logger.error(error_msg)
-            return {"error": error_msg}
-            
         except Exception as e:
             error_msg = f"执行错误: {str(e)}\n{traceback.format_exc()}"
             logger.error(error_msg)
@@ -239,32 +305,11 @@ output_path = OUTPUT_PATH
         Returns:
             Dict: 执行结果
         """
-        import threading
-        execution_result: Dict = {}
-        execution_done = threading.Event()
-        
-        def run_execution():
-            try:
-                exec_result = self.execute(code)
-                execution_result.update(exec_result)
-            except Exception as e:
-                execution_result.update({"error": str(e)})
-            finally:
-                execution_done.set()
-        
-        thread = threading.Thread(target=run_execution)
-        thread.daemon = True
-        thread.start()
-        
-        # 等待线程完成或超时
-        finished = execution_done.wait(timeout=self.timeout)
-        
-        if finished:
-            # 线程正常完成，返回结果（可能包含 error 字段）
-            return execution_result
-        else:
-            # 超时
-            return {"error": f"执行超时（{self.timeout}秒）"}
+        # 超时由 execute 保证：超时后工作进程被终止，不会有残留的执行
+        try:
+            return self.execute(code)
+        except Exception as e:
+            return {"error": str(e)}
     
     def cleanup_old_files(self, max_age: int = 3600, max_files: int = 100):
         """
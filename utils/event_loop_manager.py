@@ -6,13 +6,71 @@ EventLoop管理器
 """
 
 import asyncio
+import concurrent.futures
 import logging
+import sys
 import threading
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
 
+def install_uvloop() -> bool:
+    """
+    安装 uvloop 作为全局事件循环策略
+
+    asyncio.run()、EventLoopManager 等创建的事件循环都会通过策略生成，
+    安装后 iFlow/Ollama 等适配器的流式收发无需改动即可运行在 libuv 上。
+    Windows 上没有 uvloop，保持默认的 asyncio 事件循环。
+
+    Returns:
+        bool: 是否成功安装 uvloop
+    """
+    if sys.platform == "win32":
+        logger.debug("Windows 平台不支持 uvloop，使用默认事件循环")
+        return False
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.debug("uvloop 未安装，使用默认事件循环")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("已启用 uvloop 事件循环")
+    return True
+
+
+def run_qt_app(app) -> int:
+    """
+    运行 Qt 主循环
+
+    安装了 qasync 时，使用与 Qt 集成的 asyncio 事件循环运行程序，
+    主线程中的 Qt 回调可以用 asyncio.ensure_future() 直接调度协程；
+    未安装时退回 app.exec()。弹窗的功能调用仍提交到 EventLoopManager 的后台事件循环，
+    不依赖 qasync。
+
+    Args:
+        app: QApplication 实例
+
+    Returns:
+        int: 退出码
+    """
+    try:
+        import qasync
+    except ImportError:
+        logger.debug("qasync 未安装，使用 Qt 默认事件循环")
+        return app.exec()
+
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    logger.info("已启用 qasync 事件循环")
+    with loop:
+        # run_forever 内部调用 app.exec()，Qt 退出时返回其退出码（较旧的 qasync 返回 None）
+        exit_code = loop.run_forever()
+    return exit_code if isinstance(exit_code, int) else 0
+
+
 class EventLoopManager:
     """全局 EventLoop 管理器
     
@@ -23,6 +81,9 @@ class EventLoopManager:
     _loop = None
     _lock = None
     _initialized = False
+    # 常驻后台线程的事件循环（见 submit）
+    _bg_loop = None
+    _bg_thread = None
     
     @classmethod
     def _initialize(cls):
@@ -91,4 +152,41 @@ class EventLoopManager:
         """
         if cls._loop is None:
             return False
-        return cls._loop.is_running()
\ No newline at end of file
+        return cls._loop.is_running()
+
+    @classmethod
+    def get_background_loop(cls) -> asyncio.AbstractEventLoop:
+        """
+        获取在后台守护线程中常驻运行的 EventLoop
+
+        适配器按事件循环缓存 HTTP 客户端和连接池，在同一个常驻循环中执行请求，
+        客户端只需创建一次，连接可以跨请求复用。
+
+        Returns:
+            asyncio.AbstractEventLoop: 后台EventLoop实例
+        """
+        cls._initialize()
+
+        with cls._lock:
+            if cls._bg_loop is None or cls._bg_loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="EventLoopManager", daemon=True)
+                thread.start()
+                cls._bg_loop = loop
+                cls._bg_thread = thread
+                logger.debug("创建后台EventLoop")
+
+        return cls._bg_loop
+
+    @classmethod
+    def submit(cls, coro: Any) -> concurrent.futures.Future:
+        """
+        将协程提交到后台 EventLoop 执行（可从任意线程调用，多个协程可并发执行）
+
+        Args:
+            coro: 要运行的协程对象
+
+        Returns:
+            concurrent.futures.Future: 协程结果
+        """
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_background_loop())
@@ -8,6 +8,7 @@
 import hashlib
 import json
 import logging
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -71,13 +72,17 @@ class LocalCacheManager:
         self._save_cache()
 
 
-# 全局实例
+# 全局实例（只做同步文件读写，不持有事件循环资源，所有线程/事件循环共用一个）
 _cache_manager: Optional[LocalCacheManager] = None
+_cache_manager_lock = threading.Lock()
 
 
 def get_cache_manager() -> LocalCacheManager:
     """获取缓存管理器实例"""
     global _cache_manager
     if _cache_manager is None:
-        _cache_manager = LocalCacheManager()
+        with _cache_manager_lock:
+            # 加锁后再检查一次，避免多个线程同时首次调用时各自加载一份缓存文件
+            if _cache_manager is None:
+                _cache_manager = LocalCacheManager()
     return _cache_manager
\ No newline at end of file
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语义缓存
+按输入文本的向量相似度查找已有结果：措辞略有不同的重复请求也能命中，省去一次 LLM 调用。
+向量由 sentence-transformers 生成，近邻检索使用 hnswlib；两者均为可选依赖，未安装时查找始终未命中。
+默认关闭：短文本（如 sin(x) 与 cos(x)）的向量可能非常接近而返回另一条的结果，
+需在 settings.yaml 中设置 ai.cache.semantic.enabled: true 显式开启。
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+# 多语言小模型，输出 384 维向量
+DEFAULT_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_DIM = 384
+# 余弦相似度达到该阈值才视为同一请求
+DEFAULT_THRESHOLD = 0.92
+# 索引初始容量，写满后按倍数扩容，直到达到每个命名空间的条目上限
+_INITIAL_CAPACITY = 1024
+# 每个命名空间的默认条目上限，写满后从最旧的条目开始覆盖
+DEFAULT_MAX_ELEMENTS = 10000
+
+
+class _Namespace:
+    """一个命名空间的向量索引及对应结果（标签即 results 下标）"""
+    __slots__ = ("index", "results", "next_label")
+
+    def __init__(self, index, results: List[str], next_label: int = 0):
+        self.index = index
+        self.results = results
+        # 下一次写入的标签；达到上限后环形回绕，覆盖最旧的条目
+        self.next_label = next_label
+
+
+class SemanticCache:
+    """语义缓存"""
+
+    def __init__(self, cache_dir: Optional[str] = None, model_name: str = DEFAULT_MODEL,
+                 threshold: float = DEFAULT_THRESHOLD, max_elements: int = DEFAULT_MAX_ELEMENTS,
+                 enabled: bool = True):
+        """
+        Args:
+            cache_dir: 索引持久化目录
+            model_name: sentence-transformers 模型名称
+            threshold: 命中所需的最小余弦相似度
+            max_elements: 每个命名空间最多保留的条目数
+            enabled: 是否启用（依赖未安装时始终不启用）
+        """
+        if cache_dir is None:
+            cache_dir = Path.home() / ".word_selection_assistant" / "cache" / "semantic"
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_elements = max_elements
+        self.enabled = enabled and hnswlib is not None and SentenceTransformer is not None
+
+        self._model = None
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._dirty = set()
+        # 最近一次计算的向量：lookup 未命中后紧接着 add 同一文本时无需再次编码
+        self._last_embedding = (None, None)
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        """加载编码模型（已加载时直接返回）"""
+        if self._model is None:
+            logger.info(f"加载语义缓存模型: {self.model_name}")
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def warmup(self):
+        """预先加载编码模型，避免首次请求时在请求路径上加载（或下载）模型"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._load_model()
+        except Exception as e:
+            logger.warning(f"预加载语义缓存模型失败: {e}")
+
+    def _embed(self, text: str):
+        """编码文本为归一化向量（首次调用时加载模型）"""
+        if self._last_embedding[0] == text:
+            return self._last_embedding[1]
+        vector = self._load_model().encode([text], normalize_embeddings=True)
+        self._last_embedding = (text, vector)
+        return vector
+
+    def _paths(self, namespace: str):
+        """命名空间的索引文件和结果文件（命名空间可能含文件名非法字符，取哈希）"""
+        name = hashlib.md5(namespace.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{name}.bin", self.cache_dir / f"{name}.json"
+
+    def _get_namespace(self, namespace: str, create: bool) -> Optional[_Namespace]:
+        """获取命名空间，首次访问时从磁盘加载"""
+        ns = self._namespaces.get(namespace)
+        if ns is not None:
+            return ns
+
+        index_path, results_path = self._paths(namespace)
+        index = hnswlib.Index(space='cosine', dim=EMBEDDING_DIM)
+        if index_path.exists() and results_path.exists():
+            try:
+                data = json.loads(results_path.read_text(encoding='utf-8'))
+                # 旧格式只保存结果列表
+                if isinstance(data, list):
+                    data = {"results": data, "next_label": len(data)}
+                results = data["results"]
+                capacity = min(self.max_elements, max(_INITIAL_CAPACITY, len(results)))
+                if len(results) > capacity:
+                    # 上限调小后，超出部分的标签无法再写入索引，丢弃旧数据重新积累
+                    raise ValueError(f"条目数 {len(results)} 超过上限 {self.max_elements}")
+                index.load_index(str(index_path), max_elements=capacity)
+                ns = _Namespace(index, results, data["next_label"] % self.max_elements)
+            except Exception as e:
+                logger.warning(f"加载语义缓存失败 ({namespace}): {e}")
+
+        if ns is None:
+            if not create:
+                return None
+            index.init_index(max_elements=min(_INITIAL_CAPACITY, self.max_elements))
+            ns = _Namespace(index, [])
+
+        self._namespaces[namespace] = ns
+        return ns
+
+    def lookup(self, text: str, namespace: str) -> Optional[str]:
+        """
+        查找语义相近的已缓存结果
+
+        编码文本需要数毫秒到数十毫秒（首次还要加载模型），异步代码中应放到线程执行。
+
+        Returns:
+            命中时返回缓存的结果，否则返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                ns = self._get_namespace(namespace, create=False)
+                if ns is None or not ns.results:
+                    return None
+                # 只取最近的 1 个候选，距离由 hnswlib 在 C++ 中计算，Python 侧没有逐向量的打分或重排
+                labels, distances = ns.index.knn_query(self._embed(text), k=1)
+                # cosine 空间中距离 = 1 - 余弦相似度
+                if 1.0 - float(distances[0][0]) >= self.threshold:
+                    return ns.results[int(labels[0][0])]
+        except Exception as e:
+            logger.warning(f"语义缓存查找失败: {e}")
+        return None
+
+    def add(self, text: str, result: str, namespace: str):
+        """写入一条结果（命名空间写满后覆盖最旧的条目）"""
+        if not self.enabled or not result:
+            return
+        try:
+            with self._lock:
+                ns = self._get_namespace(namespace, create=True)
+                label = ns.next_label
+                if label >= ns.index.get_max_elements():
+                    ns.index.resize_index(min(label * 2, self.max_elements))
+                # 标签已存在时 hnswlib 原地更新该条目的向量
+                ns.index.add_items(self._embed(text), [label])
+                if label < len(ns.results):
+                    ns.results[label] = result
+                else:
+                    ns.results.append(result)
+                ns.next_label = (label + 1) % self.max_elements
+                self._dirty.add(namespace)
+        except Exception as e:
+            logger.warning(f"写入语义缓存失败: {e}")
+
+    @staticmethod
+    def namespace_for(feature: str, adapter, *options) -> str:
+        """构建命名空间：带上适配器的模型名，不同模型的回答不混用"""
+        return ":".join([feature, str(getattr(adapter, 'model', None)), *map(str, options)])
+
+    async def lookup_async(self, text: str, namespace: str) -> Optional[str]:
+        """异步版 lookup：文本编码较慢，放到线程中执行"""
+        if not self.enabled:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(None, self.lookup, text, namespace)
+
+    async def add_async(self, text: str, result: str, namespace: str):
+        """异步版 add：文本编码较慢，放到线程中执行"""
+        if not self.enabled or not result:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.add, text, result, namespace)
+
+    def save(self):
+        """把有改动的命名空间写入磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for namespace in self._dirty:
+                ns = self._namespaces[namespace]
+                index_path, results_path = self._paths(namespace)
+                try:
+                    ns.index.save_index(str(index_path))
+                    data = {"results": ns.results, "next_label": ns.next_label}
+                    results_path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+                except Exception as e:
+                    logger.error(f"保存语义缓存失败 ({namespace}): {e}")
+            self._dirty.clear()
+
+
+# 全局实例
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """
+    获取语义缓存实例
+
+    由配置 ai.cache.semantic.enabled 开启（默认关闭）；开启时在后台线程预加载模型，
+    退出时自动保存索引。
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        from utils.config_loader import get_config
+        config = get_config()
+        _semantic_cache = SemanticCache(
+            threshold=config.get('ai.cache.semantic.threshold', DEFAULT_THRESHOLD),
+            enabled=bool(config.get('ai.cache.semantic.enabled', False))
+        )
+        if _semantic_cache.enabled:
+            atexit.register(_semantic_cache.save)
+            threading.Thread(target=_semantic_cache.warmup, name="semantic-cache-warmup",
+                             daemon=True).start()
+    return _semantic_cache
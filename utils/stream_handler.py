@@ -96,7 +96,7 @@ class StreamHandler:
             on_error(str(e))
     
     @staticmethod
-    def create_mock_stream(text: str, chunk_size: int = 10) -> AsyncGenerator[Dict[str, Any], None]:
+    async def create_mock_stream(text: str, chunk_size: int = 10) -> AsyncGenerator[Dict[str, Any], None]:
         """
         创建模拟流式数据生成器（用于测试）
         
@@ -110,4 +110,4 @@ class StreamHandler:
         for i in range(0, len(text), chunk_size):
             chunk = text[i:i+chunk_size]
             yield {"content": chunk, "delta": True}
-            await asyncio.sleep(0.01)  # 模拟网络延迟
\ No newline at end of file
+            await asyncio.sleep(0)  # 让出事件循环，不人为增加延迟
\ No newline at end of file
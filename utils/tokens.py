@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token 计数
+使用 tiktoken 的 cl100k_base 编码统计 token 数；tiktoken 为可选依赖，未安装时按字符数估算。
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 中日韩字符（含全角标点）：每个字符约占 1 个 token，远多于拉丁文本的 4 字符/token
+_CJK_RE = re.compile(
+    r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+    r"\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+
+# tiktoken 编码器缓存（首次使用时加载），False 表示 tiktoken 不可用
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """统计 token 数，tiktoken 不可用时按中日韩字符 1 个/token、其余字符 4 个/token 估算"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.debug(f"tiktoken 不可用，使用字符数估算 token: {e}")
+            _encoding = False
+    if _encoding is False:
+        if not text:
+            return 0
+        cjk = len(_CJK_RE.findall(text))
+        return max(1, cjk + (len(text) - cjk) // 4)
+    return len(_encoding.encode(text))